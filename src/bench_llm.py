@@ -0,0 +1,182 @@
+'''
+Benchmark the two llm.py stages across models.
+
+    python bench_llm.py --models mistral phi3 llama3.1
+    python bench_llm.py --mock                       # no Ollama needed (see mock_ollama.py)
+
+Every shadow in the corpus (default: ../output/*_transcription.txt and
+../transcript.txt) goes through stage 1 and then stage 2 on each model, with the
+response cache off. Each call records its wall latency and Ollama's own
+prompt-eval and eval counters. Outputs are checked for validity:
+- stage 1 must keep every session number.
+- stage 2 must match SUMMARY_SCHEMA and carry the right shadow_id.
+A per-model table is printed, and the raw rows plus aggregates are written as JSON.
+'''
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+import statistics
+
+from transcript_io import split_session_name, iter_shadows, format_shadow_transcript
+
+REPO_ROOT=os.path.join(os.path.dirname(os.path.abspath(__file__)),"..")
+DEFAULT_CORPUS=[os.path.join(REPO_ROOT,"output"),os.path.join(REPO_ROOT,"transcript.txt")]
+DEFAULT_MODELS=["mistral"]
+
+def _add_session(shadows,source,name,text):
+    shadow_id,session=split_session_name(name)
+    shadows.setdefault((source,shadow_id),[]).append({"session":session,"text":text.strip()})
+
+def load_corpus(paths):
+    # -> [(source, shadow_id, transcript)] in first-seen order; a shadow is only merged within one source
+    shadows={}
+    for path in paths:
+        source=os.path.basename(os.path.normpath(path))
+        if os.path.isdir(path):
+            for file in sorted(glob.glob(os.path.join(path,"*_transcription.txt"))):
+                with open(file,"r",encoding="utf-8") as f:
+                    _add_session(shadows,source,os.path.basename(file)[:-len("_transcription.txt")],f.read())
+        elif path.endswith(".jsonl"):
+            for shadow_id,records in iter_shadows(path):
+                shadows.setdefault((source,shadow_id),[]).extend(records)
+        else:
+            # transcript.txt layout: "atlas_2025_1.mp3: text" per line
+            with open(path,"r",encoding="utf-8") as f:
+                for line in f:
+                    name,sep,text=line.partition(":")
+                    if sep and text.strip():
+                        _add_session(shadows,source,name.strip(),text)
+    corpus=[]
+    for (source,shadow_id),records in shadows.items():
+        records=sorted(records,key=lambda r:r["session"])
+        corpus.append((source,shadow_id,format_shadow_transcript(shadow_id,records)))
+    return corpus
+
+def propositions_valid(transcript,propositions):
+    expected=set(re.findall(r"^(\d+)\.\s*$",transcript,flags=re.M))
+    found=set(re.findall(r"^\s*(\d+)\.",propositions,flags=re.M))
+    if not propositions.strip():
+        return False,"empty"
+    missing=sorted(expected-found,key=int)
+    return (False,f"missing sessions {','.join(missing)}") if missing else (True,None)
+
+def summary_valid(llm,shadow_id,text):
+    try:
+        data=llm.validate_summary(text)
+    except ValueError as e:
+        return False,str(e)
+    if data["shadow_id"]!=shadow_id:
+        return False,f"shadow_id {data['shadow_id']!r} != {shadow_id!r}"
+    return True,None
+
+def timed_call(llm,stage,call):
+    # run one stage; pairs the wall time with the eval counters llm.py logged for the call
+    logged=len(llm.eval_log)
+    started=time.perf_counter()
+    try:
+        reply,error=call(),None
+    except Exception as e:
+        reply,error=None,f"{type(e).__name__}: {e}"
+    row={"stage":stage,"latency":round(time.perf_counter()-started,3),"error":error}
+    stats=llm.eval_log[-1] if len(llm.eval_log)>logged else {}
+    for field in llm.EVAL_FIELDS:
+        row[field]=stats.get(field,0)
+    return reply,row
+
+def run_model(llm,model,corpus):
+    rows=[]
+    for source,shadow_id,transcript in corpus:
+        print(f"[{model}] {source}/{shadow_id}")
+        propositions,row=timed_call(llm,"propositions",lambda:llm.generate_propositions(transcript,model))
+        row["valid"],row["invalid_reason"]=propositions_valid(transcript,propositions) if propositions is not None else (False,row["error"])
+        rows.append(dict(row,model=model,source=source,shadow_id=shadow_id))
+        if propositions is None:
+            continue
+        summary,row=timed_call(llm,"summary",lambda:llm.read_propositions_to_generate_json_summary(propositions,model))
+        row["valid"],row["invalid_reason"]=summary_valid(llm,shadow_id,summary) if summary is not None else (False,row["error"])
+        rows.append(dict(row,model=model,source=source,shadow_id=shadow_id))
+    return rows
+
+def _percentile(values,q):
+    values=sorted(values)
+    return values[min(len(values)-1,int(round(q*(len(values)-1))))]
+
+def aggregate(rows):
+    # per (model, stage): latency distribution, throughput from Ollama's counters, validity rate
+    groups={}
+    for row in rows:
+        groups.setdefault((row["model"],row["stage"]),[]).append(row)
+    results=[]
+    for (model,stage),group in groups.items():
+        latencies=[r["latency"] for r in group]
+        prompt_tokens=sum(r["prompt_eval_count"] for r in group)
+        prompt_seconds=sum(r["prompt_eval_duration"] for r in group)/1e9
+        eval_tokens=sum(r["eval_count"] for r in group)
+        eval_seconds=sum(r["eval_duration"] for r in group)/1e9
+        results.append({
+            "model":model,
+            "stage":stage,
+            "calls":len(group),
+            "errors":sum(1 for r in group if r["error"]),
+            "mean_latency":round(statistics.mean(latencies),3),
+            "p50_latency":_percentile(latencies,0.5),
+            "p95_latency":_percentile(latencies,0.95),
+            "prompt_eval_seconds":round(prompt_seconds,3),
+            "eval_seconds":round(eval_seconds,3),
+            "prompt_tokens_per_second":round(prompt_tokens/prompt_seconds,1) if prompt_seconds else None,
+            "tokens_per_second":round(eval_tokens/eval_seconds,1) if eval_seconds else None,
+            "valid_rate":round(sum(1 for r in group if r["valid"])/len(group),3),
+        })
+    return results
+
+def print_table(results):
+    header=f"{'model':<14}{'stage':<14}{'calls':>6}{'mean s':>9}{'p95 s':>9}{'prompt s':>10}{'eval s':>9}{'tok/s':>8}{'valid':>7}"
+    print(header)
+    print("-"*len(header))
+    for r in results:
+        tps=f"{r['tokens_per_second']:.1f}" if r["tokens_per_second"] else "-"
+        print(f"{r['model']:<14}{r['stage']:<14}{r['calls']:>6}{r['mean_latency']:>9.2f}{r['p95_latency']:>9.2f}"
+              f"{r['prompt_eval_seconds']:>10.2f}{r['eval_seconds']:>9.2f}{tps:>8}{r['valid_rate']:>7.0%}")
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Latency, throughput and output validity of the llm.py stages per model")
+    parser.add_argument("--models",nargs="+",default=DEFAULT_MODELS)
+    parser.add_argument("--corpus",nargs="+",default=DEFAULT_CORPUS,help="directories of *_transcription.txt, transcript.txt-style files or .jsonl records")
+    parser.add_argument("--limit",type=int,help="only the first N shadows")
+    parser.add_argument("--output",default="bench_llm.json",help="where to write rows and aggregates")
+    parser.add_argument("--mock",action="store_true",help="run against an in-process mock_ollama server instead of Ollama")
+    parser.add_argument("--fixtures",help="mock: directory of recorded responses (default: mock_ollama.FIXTURE_DIR)")
+    parser.add_argument("--strict",action="store_true",help="mock: fail requests that have no recorded fixture")
+    args=parser.parse_args()
+
+    corpus=load_corpus(args.corpus)[:args.limit]
+    if not corpus:
+        sys.exit("no transcripts found in "+", ".join(args.corpus))
+    server=None
+    if args.mock:
+        import mock_ollama
+        mock=mock_ollama.MockOllama(args.fixtures or mock_ollama.FIXTURE_DIR,strict=args.strict)
+        server,url=mock_ollama.start(mock)
+        # the ollama module builds its default client from OLLAMA_HOST at import time
+        os.environ["OLLAMA_HOST"]=url
+        print(f"mock ollama on {url}")
+    import llm
+    llm.configure_cache(False)
+
+    rows=[]
+    for model in args.models:
+        rows.extend(run_model(llm,model,corpus))
+    results=aggregate(rows)
+    print()
+    print_table(results)
+    report={"corpus":args.corpus,"shadows":len(corpus),"mock":args.mock,"results":results,"rows":rows}
+    if server is not None:
+        report["mock_stats"]=mock.stats
+        server.shutdown()
+    with open(args.output,"w",encoding="utf-8") as f:
+        json.dump(report,f,indent=2)
+    print(f"\nbenchmark written to {args.output}")
@@ -0,0 +1,99 @@
+'''
+Micro-benchmark for textToPropSentences: the compiled filler passes and the
+template scan against the original one-regex-at-a-time loops.
+
+    python bench_props.py                          # ../transcript.txt, grown to 1 MB
+    python bench_props.py transcript.txt --mb 4 --repeat 5
+
+The corpus is repeated up to --mb megabytes. Each implementation runs --repeat
+times and the best run is reported as MB/s of input. Both implementations
+must produce identical output, or the script exits with status 1.
+'''
+import os
+import re
+import sys
+import time
+import argparse
+
+from textToPropSentences import FILLERS, TEMPLATES, clean_text, map_to_propositions
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+# the pre-compilation implementations, kept verbatim as the reference
+def reference_clean_text(text: str) -> str:
+    text = text.lower()
+    for f in FILLERS:
+        text = re.sub(f, "", text, flags=re.I)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def reference_map_to_propositions(text: str):
+    sentences = re.split(r"[.?!]", text)
+    results = []
+    for s in sentences:
+        s = s.strip()
+        if not s:
+            continue
+        mapped = None
+        for pat, func in TEMPLATES:
+            m = re.search(pat, s)
+            if m:
+                mapped = func(m)
+                results.append(mapped)
+                break
+        if not mapped:
+            results.append(s)
+    return results
+
+
+def load_corpus(paths, megabytes: float) -> str:
+    text = ""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            text += f.read() + "\n"
+    if not text.strip():
+        raise SystemExit("empty corpus")
+    target = int(megabytes * 1024 * 1024)
+    return (text * (target // len(text.encode("utf-8")) + 1))[:target]
+
+
+def best_time(func, arg, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of clean_text and map_to_propositions")
+    parser.add_argument("corpus", nargs="*", default=[os.path.join(REPO_ROOT, "transcript.txt")])
+    parser.add_argument("--mb", type=float, default=1.0, help="repeat the corpus up to this many megabytes")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per implementation; the best is reported")
+    args = parser.parse_args()
+
+    text = load_corpus(args.corpus, args.mb)
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    print(f"corpus: {size_mb:.2f} MB from {', '.join(args.corpus)}")
+
+    ref_clean_time, ref_cleaned = best_time(reference_clean_text, text, args.repeat)
+    clean_time, cleaned = best_time(clean_text, text, args.repeat)
+    ref_map_time, ref_props = best_time(reference_map_to_propositions, ref_cleaned, args.repeat)
+    map_time, props = best_time(map_to_propositions, cleaned, args.repeat)
+
+    print(f"{'stage':<22}{'reference MB/s':>16}{'compiled MB/s':>16}{'speedup':>10}")
+    for stage, ref_time, new_time in (("clean_text", ref_clean_time, clean_time),
+                                      ("map_to_propositions", ref_map_time, map_time)):
+        print(f"{stage:<22}{size_mb / ref_time:>16.2f}{size_mb / new_time:>16.2f}{ref_time / new_time:>9.2f}x")
+
+    if cleaned != ref_cleaned or props != ref_props:
+        print("output differs from the reference implementation")
+        sys.exit(1)
+    print(f"output identical ({len(props)} propositions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+'''
+Regression check for truth_weaver.py --contradictions on real interview text.
+
+    python check_contradictions.py                     # ../transcript.txt
+    python check_contradictions.py clips/transcript.txt --expect atlas_2025:1,5
+
+Reads a combined transcript as main.py batch mode writes it ("clip.mp3: text"
+per line), runs every shadow through TruthWeaver with claim contradictions on
+and prints each claim_contradiction with its sessions and reason. Each --expect
+SHADOW:S1,S2 must be among them, or the script exits with status 1. For the
+repo's transcript.txt the expectations default to the two contradictions
+these interviews contain: atlas_2025 claims to be a DevOps engineer in
+session 1 and denies it in session 5, and titan_2023 goes from "seven years"
+to "two years".
+'''
+import os
+import sys
+import logging
+import argparse
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from transcript_io import split_session_name
+from truth_weaver import TruthWeaver
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_TRANSCRIPT = os.path.join(REPO_ROOT, "transcript.txt")
+TRANSCRIPT_EXPECTED = ["atlas_2025:1,5", "titan_2023:1,5"]
+
+
+def load_shadows(path: str) -> Dict[str, List[str]]:
+    """Combined transcript -> {shadow_id: [session text, ...]} in session order"""
+    shadows: Dict[str, List[Tuple[int, str]]] = OrderedDict()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            name, sep, text = line.partition(":")
+            if not sep or not text.strip():
+                continue
+            shadow_id, session = split_session_name(name.strip())
+            shadows.setdefault(shadow_id, []).append((session, text.strip()))
+    return OrderedDict((shadow_id, [text for _, text in sorted(sessions)]) for shadow_id, sessions in shadows.items())
+
+
+def parse_expectation(value: str) -> Tuple[str, Tuple[int, ...]]:
+    shadow_id, _, sessions = value.rpartition(":")
+    if not shadow_id:
+        raise argparse.ArgumentTypeError(f"expected SHADOW:S1,S2, got {value!r}")
+    return shadow_id, tuple(sorted(int(s) for s in sessions.split(",")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that --contradictions reports known claim contradictions")
+    parser.add_argument("transcript", nargs="?", default=DEFAULT_TRANSCRIPT)
+    parser.add_argument("--expect", action="append", type=parse_expectation,
+                        help="SHADOW:S1,S2 that must be reported (repeatable; defaults to transcript.txt's)")
+    args = parser.parse_args()
+    expected = args.expect
+    if expected is None:
+        expected = [parse_expectation(value) for value in TRANSCRIPT_EXPECTED] \
+            if os.path.abspath(args.transcript) == os.path.abspath(DEFAULT_TRANSCRIPT) else []
+
+    logging.getLogger("truth_weaver").setLevel(logging.WARNING)
+    weaver = TruthWeaver(quiet=True, claim_contradictions=True)
+    reported = set()
+    for shadow_id, sessions in load_shadows(args.transcript).items():
+        for pattern in weaver.analyze_shadow(shadow_id, sessions)["deception_patterns"]:
+            if pattern["lie_type"] != "claim_contradiction":
+                continue
+            sessions_involved = tuple(pattern["sessions_involved"])
+            reported.add((shadow_id, sessions_involved))
+            first, second = pattern["contradictory_claims"]
+            print(f"{shadow_id} sessions {sessions_involved} ({pattern['reason']}): {first!r} / {second!r}")
+    print(f"{len(reported)} claim contradictions reported")
+
+    missing = [item for item in expected if item not in reported]
+    for shadow_id, sessions in missing:
+        print(f"missing: {shadow_id} sessions {sessions}")
+    if missing:
+        sys.exit(1)
+    if expected:
+        print(f"all {len(expected)} expected contradictions reported")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+'''
+On-disk inverted index over TruthWeaver results, for questions across runs
+and shadows ("who listed Kubernetes and contradicted a leadership claim?")
+without reloading every truth_analysis.json.
+
+    python claim_index.py build index/ truth_analysis.json more_results.jsonl
+    python claim_index.py query index/ skill:kubernetes lie:leadership_contradiction
+    python claim_index.py query index/ claim:leadership_roles@1 claim:individual@3 -lie:experience_inflation
+    python claim_index.py terms index/ --prefix skill:
+    python truth_weaver.py big_batch.txt --index index/     # appended while results are written
+
+Every result is one document. Its terms (see result_terms) are:
+    shadow:<id>  language:<lang>  mastery:<level>  experience:<value>
+    leadership:<value>  team:<value>  skill:<skill>
+    lie:<lie_type>  lie:<lie_type>@<session>  lie_claim:<contradictory claim>
+    claim:<category>  claim:<category>@<session>   (from the result's "claims")
+Values are lowercased, with spaces replaced by '_'.
+
+Layout of the index directory:
+- docs.jsonl: one compact result line per document, with docs.offsets (uint64
+  start offsets) to fetch any document directly.
+- seg-NNNNN.idx: immutable segments, each covering a contiguous range of
+  document ids. A header is followed by the postings (uint32 document ids,
+  ascending), then the lexicon (terms sorted as UTF-8 bytes) and fixed-size
+  term records. A lookup is a binary search over the records.
+- manifest.json: the segments and the committed document count and sizes.
+  It is replaced atomically whenever a segment is written.
+
+The writer holds postings in memory for at most segment_size documents, then
+writes a segment. Readers mmap the segments and the documents, and see
+everything up to the last committed segment. Document ids and postings are
+stored little-endian.
+'''
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import argparse
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from result_writer import compact
+
+MANIFEST = 'manifest.json'
+DOCS = 'docs.jsonl'
+OFFSETS = 'docs.offsets'
+SEGMENT_MAGIC = b'CLAIMIX1'
+# magic, first doc id, doc count, term count, lexicon offset, records offset
+HEADER = struct.Struct('<8sQQQQQ')
+# lexicon offset, term length, postings offset (in ids from the end of the header), postings count
+RECORD = struct.Struct('<QIQI')
+DEFAULT_SEGMENT_SIZE = 65536
+
+
+def _value(value: Any) -> str:
+    return '_'.join(str(value).lower().split())
+
+
+def result_terms(result: Dict[str, Any]) -> Set[str]:
+    """Index terms for one TruthWeaver result"""
+    terms = {f"shadow:{_value(result.get('shadow_id', 'unknown'))}"}
+    truth = result.get('revealed_truth', {})
+    for field, key in (('language', 'programming_language'), ('mastery', 'skill_mastery'),
+                       ('experience', 'programming_experience'), ('leadership', 'leadership_claims'),
+                       ('team', 'team_experience')):
+        if truth.get(key):
+            terms.add(f"{field}:{_value(truth[key])}")
+    for skill in truth.get('skills_and_other_keywords', []):
+        terms.add(f"skill:{_value(skill)}")
+    for pattern in result.get('deception_patterns', []):
+        lie = _value(pattern.get('lie_type', 'unknown'))
+        terms.add(f"lie:{lie}")
+        for session in pattern.get('sessions_involved', []):
+            terms.add(f"lie:{lie}@{session}")
+        for claim in pattern.get('contradictory_claims', []):
+            terms.add(f"lie_claim:{_value(claim)}")
+    for claim in result.get('claims', []):
+        category = _value(claim['category'])
+        terms.add(f"claim:{category}")
+        terms.add(f"claim:{category}@{claim['session']}")
+    return terms
+
+
+def _read_manifest(directory: str) -> Dict[str, Any]:
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {'segments': [], 'doc_count': 0, 'docs_bytes': 0}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _little_endian(ids: array) -> array:
+    if sys.byteorder != 'little':
+        ids = array(ids.typecode, ids)
+        ids.byteswap()
+    return ids
+
+
+class ClaimIndexWriter:
+    """Appends documents to an index directory; also a ResultWriter sink (write(result, text))"""
+
+    def __init__(self, directory: str, segment_size: int = DEFAULT_SEGMENT_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = max(1, segment_size)
+        self.manifest = _read_manifest(directory)
+        self.doc_count = self.manifest['doc_count']
+        # drop documents an interrupted run appended after the last committed segment
+        self.docs = open(os.path.join(directory, DOCS), 'ab')
+        self.docs.truncate(self.manifest['docs_bytes'])
+        self.docs.seek(self.manifest['docs_bytes'])
+        self.offsets = open(os.path.join(directory, OFFSETS), 'ab')
+        self.offsets.truncate(self.doc_count * 8)
+        self.offsets.seek(self.doc_count * 8)
+        self.docs_bytes = self.manifest['docs_bytes']
+        self._first_doc = self.doc_count
+        self._postings: Dict[str, array] = {}
+
+    def add(self, result: Dict[str, Any], line: Optional[str] = None) -> int:
+        """Index one result; returns its document id"""
+        doc_id = self.doc_count
+        if line is None:
+            line = json.dumps(result, ensure_ascii=False)
+        data = line.encode('utf-8') + b'\n'
+        self.offsets.write(struct.pack('<Q', self.docs_bytes))
+        self.docs.write(data)
+        self.docs_bytes += len(data)
+        for term in result_terms(result):
+            ids = self._postings.get(term)
+            if ids is None:
+                ids = self._postings[term] = array('I')
+            ids.append(doc_id)
+        self.doc_count += 1
+        if self.doc_count - self._first_doc >= self.segment_size:
+            self.commit()
+        return doc_id
+
+    def write(self, result: Dict[str, Any], text: str):
+        self.add(result, compact(text))
+
+    def flush(self):
+        # segments are only written every segment_size documents; this just pushes the documents out
+        self.docs.flush()
+        self.offsets.flush()
+
+    def commit(self):
+        """Write the buffered postings as a segment and publish it in the manifest"""
+        if self.doc_count == self._first_doc:
+            return
+        self.flush()
+        os.fsync(self.docs.fileno())
+        os.fsync(self.offsets.fileno())
+        name = f"seg-{len(self.manifest['segments']) + 1:05d}.idx"
+        self._write_segment(os.path.join(self.directory, name))
+        self.manifest = {
+            'segments': self.manifest['segments'] + [name],
+            'doc_count': self.doc_count,
+            'docs_bytes': self.docs_bytes,
+        }
+        tmp = os.path.join(self.directory, MANIFEST + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.directory, MANIFEST))
+        self._first_doc = self.doc_count
+        self._postings = {}
+
+    def _write_segment(self, path: str):
+        terms = sorted(self._postings, key=lambda t: t.encode('utf-8'))
+        lexicon = bytearray()
+        records = bytearray()
+        postings_count = 0
+        for term in terms:
+            encoded = term.encode('utf-8')
+            records += RECORD.pack(len(lexicon), len(encoded), postings_count, len(self._postings[term]))
+            lexicon += encoded
+            postings_count += len(self._postings[term])
+        lexicon_offset = HEADER.size + postings_count * 4
+        records_offset = lexicon_offset + len(lexicon)
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(SEGMENT_MAGIC, self._first_doc, self.doc_count - self._first_doc,
+                                len(terms), lexicon_offset, records_offset))
+            for term in terms:
+                _little_endian(self._postings[term]).tofile(f)
+            f.write(lexicon)
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        self.commit()
+        self.docs.close()
+        self.offsets.close()
+
+    def __enter__(self) -> "ClaimIndexWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _Segment:
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.first_doc, self.doc_count, self.term_count, self.lexicon_offset, self.records_offset = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a claim index segment")
+        self.ids = memoryview(self.map)[HEADER.size:self.lexicon_offset].cast('I')
+
+    def _term(self, index: int) -> Tuple[bytes, int, int]:
+        lex_offset, length, postings, count = RECORD.unpack_from(self.map, self.records_offset + index * RECORD.size)
+        start = self.lexicon_offset + lex_offset
+        return self.map[start:start + length], postings, count
+
+    def _search(self, key: bytes) -> int:
+        """Index of the first term >= key"""
+        low, high = 0, self.term_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._term(mid)[0] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def postings(self, term: str) -> memoryview:
+        key = term.encode('utf-8')
+        index = self._search(key)
+        if index < self.term_count:
+            found, postings, count = self._term(index)
+            if found == key:
+                return self.ids[postings:postings + count]
+        return self.ids[0:0]
+
+    def terms(self, prefix: str = '') -> Iterator[Tuple[str, int]]:
+        key = prefix.encode('utf-8')
+        for index in range(self._search(key), self.term_count):
+            term, _, count = self._term(index)
+            if not term.startswith(key):
+                break
+            yield term.decode('utf-8'), count
+
+    def close(self):
+        self.ids.release()
+        self.map.close()
+
+
+def _intersect(found: Set[int], ids: memoryview) -> Set[int]:
+    # a few survivors against a long list: binary-search each one; otherwise let set() walk the list in C
+    if len(found) * 32 < len(ids):
+        kept = set()
+        for doc_id in found:
+            index = bisect_left(ids, doc_id)
+            if index < len(ids) and ids[index] == doc_id:
+                kept.add(doc_id)
+        return kept
+    found.intersection_update(ids)
+    return found
+
+
+class ClaimIndex:
+    """Read side: memory-mapped segments and documents"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest = _read_manifest(directory)
+        self.doc_count = self.manifest['doc_count']
+        self.segments = [_Segment(os.path.join(directory, name)) for name in self.manifest['segments']]
+        self._docs = self._offsets = None
+        if self.doc_count:
+            with open(os.path.join(directory, DOCS), 'rb') as f:
+                self._docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(os.path.join(directory, OFFSETS), 'rb') as f:
+                self._offsets = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def count(self, term: str) -> int:
+        return sum(len(segment.postings(term.lower())) for segment in self.segments)
+
+    def search(self, include: Iterable[str], exclude: Iterable[str] = (), limit: Optional[int] = None) -> List[int]:
+        """Document ids having every include term and none of the exclude terms, ascending"""
+        include = [term.lower() for term in include]
+        exclude = [term.lower() for term in exclude]
+        if not include:
+            raise ValueError("a query needs at least one term to include")
+        found: List[int] = []
+        for segment in self.segments:
+            lists = sorted((segment.postings(term) for term in include), key=len)
+            matched = set(lists[0])
+            for ids in lists[1:]:
+                if not matched:
+                    break
+                matched = _intersect(matched, ids)
+            for term in exclude:
+                if not matched:
+                    break
+                matched.difference_update(segment.postings(term))
+            # segments hold ascending, non-overlapping id ranges
+            found.extend(sorted(matched))
+            if limit is not None and len(found) >= limit:
+                return found[:limit]
+        return found
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        if not 0 <= doc_id < self.doc_count:
+            raise IndexError(doc_id)
+        start = struct.unpack_from('<Q', self._offsets, doc_id * 8)[0]
+        end = self._docs.find(b'\n', start)
+        return json.loads(self._docs[start:end])
+
+    def terms(self, prefix: str = '') -> List[Tuple[str, int]]:
+        """(term, document count) for every term starting with prefix"""
+        counts: Dict[str, int] = {}
+        for segment in self.segments:
+            for term, count in segment.terms(prefix.lower()):
+                counts[term] = counts.get(term, 0) + count
+        return sorted(counts.items())
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        for mapped in (self._docs, self._offsets):
+            if mapped is not None:
+                mapped.close()
+
+    def __enter__(self) -> "ClaimIndex":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_result_file(path: str) -> Iterator[Dict[str, Any]]:
+    """Results from truth_analysis.json (a JSON array) or a .jsonl file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the cross-shadow claim index")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="append result files to an index")
+    build.add_argument('index')
+    build.add_argument('results', nargs='+', help="truth_analysis.json or .jsonl result files")
+    build.add_argument('--segment-size', type=int, default=DEFAULT_SEGMENT_SIZE, help="documents per segment")
+    query = commands.add_parser('query', help="shadows matching every term; prefix a term with - to exclude it")
+    query.add_argument('index')
+    query.add_argument('terms', nargs='+')
+    query.add_argument('--limit', type=int, default=20, help="results to print (0 = all)")
+    query.add_argument('--full', action='store_true', help="print the whole stored result for each hit")
+    terms = commands.add_parser('terms', help="list terms and their document counts")
+    terms.add_argument('index')
+    terms.add_argument('--prefix', default='')
+    stats = commands.add_parser('stats', help="documents, segments and size on disk")
+    stats.add_argument('index')
+    # "-lie:x" would otherwise be read as an option
+    args, extra = parser.parse_known_args()
+    if extra:
+        if args.command != 'query':
+            parser.error(f"unrecognized arguments: {' '.join(extra)}")
+        args.terms += extra
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        with ClaimIndexWriter(args.index, args.segment_size) as writer:
+            first = writer.doc_count
+            for path in args.results:
+                for result in iter_result_file(path):
+                    writer.add(result)
+        elapsed = time.perf_counter() - started
+        print(f"indexed {writer.doc_count - first} results in {elapsed:.1f}s ({writer.doc_count} documents in {args.index})")
+        return
+
+    with ClaimIndex(args.index) as index:
+        if args.command == 'query':
+            include = [term for term in args.terms if not term.startswith('-')]
+            exclude = [term[1:] for term in args.terms if term.startswith('-')]
+            started = time.perf_counter()
+            doc_ids = index.search(include, exclude)
+            elapsed = time.perf_counter() - started
+            print(f"{len(doc_ids)} matching documents of {index.doc_count} ({elapsed * 1000:.2f} ms)")
+            for doc_id in doc_ids[:args.limit or None]:
+                document = index.document(doc_id)
+                if args.full:
+                    print(json.dumps(document, indent=2, ensure_ascii=False))
+                else:
+                    lies = sorted({p['lie_type'] for p in document.get('deception_patterns', [])})
+                    print(f"  {doc_id}\t{document.get('shadow_id')}\t{', '.join(lies) or '-'}")
+        elif args.command == 'terms':
+            for term, count in index.terms(args.prefix):
+                print(f"{count:>10}  {term}")
+        else:
+            size = sum(os.path.getsize(os.path.join(args.index, name)) for name in os.listdir(args.index))
+            print(f"{index.doc_count} documents, {len(index.segments)} segments, "
+                  f"{sum(s.term_count for s in index.segments)} term entries, {size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+'''
+Typed claims extracted once per shadow, stored column-wise.
+
+One pass over a shadow's text collects every claim the extractors and the
+contradiction checks care about:
+- durations ("5 years", "8 months"), in months
+- team sizes ("team of 6", "12 developers")
+- role keywords (leadership roles, working alone)
+- confidence markers
+Each claim records its session and its span within that session. Claims sit
+in parallel stdlib arrays instead of one dict per claim, and strings are
+interned once. records() turns rows back into dicts when provenance goes into
+the output.
+'''
+import re
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from keyword_matcher import KeywordIndex
+
+DURATION = 0
+TEAM_SIZE = 1
+ROLE = 2
+CONFIDENCE = 3
+KIND_NAMES = ('duration', 'team_size', 'role', 'confidence')
+MONTHS_PER_UNIT = {'years': 12, 'months': 1}
+
+
+class ClaimTable:
+    def __init__(self, keywords: KeywordIndex):
+        self.keywords = keywords
+        self.kind = array('b')
+        self.category = array('i')     # interned: years/months/team_size, role group, confidence level
+        self.label = array('i')        # interned: "5 years", matched team phrase, role/marker keyword
+        self.value = array('q')        # months for durations, people for team sizes, else -1
+        self.session = array('i')      # 0-based
+        self.start = array('q')        # span within the session's lowercased text
+        self.end = array('q')
+        self.contained = array('b')    # 0 when the match runs across the space joining two sessions
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._big_values: Dict[int, int] = {}   # values that don't fit the int64 column
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def append(self, kind: int, category: str, label: str, start: int, end: int, value: int = -1):
+        """Add a claim found at [start, end) of the joined text"""
+        session, offset, contained = self.keywords.text.locate(start, end)
+        try:
+            self.value.append(value)
+        except OverflowError:
+            self._big_values[len(self.value)] = value
+            self.value.append(-1)
+        self.kind.append(kind)
+        self.category.append(self._intern(category))
+        self.label.append(self._intern(label))
+        self.session.append(session)
+        self.start.append(offset)
+        self.end.append(offset + end - start)
+        self.contained.append(contained)
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def category_of(self, row: int) -> str:
+        return self.strings[self.category[row]]
+
+    def label_of(self, row: int) -> str:
+        return self.strings[self.label[row]]
+
+    def value_of(self, row: int) -> int:
+        return self._big_values.get(row, self.value[row])
+
+    def rows(self, category: Optional[str] = None, kind: Optional[int] = None,
+             session: Optional[int] = None) -> List[int]:
+        """Row numbers in extraction order; with session, only claims that lie fully inside it"""
+        category_id = self._string_ids.get(category, -1) if category is not None else None
+        if category is not None and category_id < 0:
+            return []
+        return [row for row in range(len(self))
+                if (category_id is None or self.category[row] == category_id)
+                and (kind is None or self.kind[row] == kind)
+                and (session is None or (self.session[row] == session and self.contained[row]))]
+
+    def sessions_with(self, category: str) -> List[int]:
+        return sorted({self.session[row] for row in self.rows(category) if self.contained[row]})
+
+    def record(self, row: int) -> Dict[str, Any]:
+        record = {
+            'type': KIND_NAMES[self.kind[row]],
+            'category': self.category_of(row),
+            'claim': self.label_of(row),
+            'session': self.session[row] + 1,
+            'span': [self.start[row], self.end[row]],
+        }
+        if self.kind[row] == DURATION:
+            record['months'] = self.value_of(row)
+        elif self.kind[row] == TEAM_SIZE:
+            record['team_size'] = self.value_of(row)
+        return record
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [self.record(row) for row in range(len(self))]
+
+
+def extract_claims(keywords: KeywordIndex, duration_patterns: Dict[str, re.Pattern],
+                   team_size_pattern: re.Pattern, role_categories: Iterable[str],
+                   confidence_categories: Iterable[Tuple[str, str]]) -> ClaimTable:
+    """Fill a ClaimTable from the shadow's joined text and its keyword hits.
+
+    duration_patterns maps 'years'/'months' to a regex whose group 1 is the number;
+    confidence_categories pairs keyword categories with the level they stand for.
+    """
+    table = ClaimTable(keywords)
+    text = keywords.text.text
+    for unit, pattern in duration_patterns.items():
+        for match in pattern.finditer(text):
+            digits = match.group(1)
+            table.append(DURATION, unit, f"{digits} {unit}", match.start(), match.end(),
+                         int(digits) * MONTHS_PER_UNIT[unit])
+    for match in team_size_pattern.finditer(text):
+        size = next(group for group in match.groups() if group)
+        table.append(TEAM_SIZE, 'team_size', match.group(0), match.start(), match.end(), int(size))
+    roles = set(role_categories)
+    levels = dict(confidence_categories)
+    for hit in keywords.hits:
+        start = keywords.text.starts[hit.session] + hit.offset
+        if hit.category in roles:
+            table.append(ROLE, hit.category, hit.keyword, start, start + len(hit.keyword))
+        elif hit.category in levels:
+            table.append(CONFIDENCE, levels[hit.category], hit.keyword, start, start + len(hit.keyword))
+    return table
@@ -0,0 +1,127 @@
+'''
+Content-addressed on-disk JSON cache with least-recently-used eviction.
+
+Entries live at <directory>/<key[:2]>/<key>.json. Keys are SHA-256 digests of
+whatever inputs determine the value (see make_key). Reads touch the entry's
+mtime, so evicting the oldest mtimes first gives LRU order. Writes go through a
+temp file and os.replace so concurrent processes never see a partial entry.
+Threads sharing one DiskCache (pipeline.py's two LLM stages) take a lock for
+the size bookkeeping and eviction.
+'''
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from typing import Any, Optional
+
+DEFAULT_CACHE_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "truth_weaver")
+
+
+def _json_default(value):
+    # numpy scalars/arrays that slip into Whisper results
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def make_key(*parts: Any) -> str:
+    """Hash an ordered set of JSON-serializable inputs into a cache key"""
+    payload = json.dumps(parts, sort_keys=True, default=_json_default, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None  # computed lazily on first write
+        # guards _size and eviction; reentrant because put() evicts while holding it
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or unreadable entry"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, default=_json_default, ensure_ascii=False)
+            with self._lock:
+                # an overwritten entry's bytes leave the cache with it
+                try:
+                    replaced = os.path.getsize(path)
+                except FileNotFoundError:
+                    replaced = 0
+                os.replace(tmp_path, path)
+                if self._size is None:
+                    self._size = self.size()
+                else:
+                    self._size += os.path.getsize(path) - replaced
+                if self._size > self.max_bytes:
+                    self.evict()
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+            self._size = total
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in list(self._entries()):
+                os.remove(path)
+            self._size = 0
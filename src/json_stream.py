@@ -0,0 +1,106 @@
+'''
+Incremental structural JSON checker for streamed LLM output.
+
+Feed it chunks as tokens arrive. It tracks string/escape state and bracket
+nesting, so it can report:
+- "invalid" as soon as the output can no longer be one JSON object
+  (prose before the opening brace, mismatched brackets)
+- "complete" once the top-level object closes, so the caller can stop
+  generation without waiting for trailing chatter (which is ignored)
+- the time the first top-level field finished, for latency metrics
+
+It checks structure only. Literals are not validated as they stream; call
+json.loads on the completed text for that.
+'''
+import time
+from typing import Optional
+
+PENDING = "pending"
+COMPLETE = "complete"
+INVALID = "invalid"
+
+OPENERS = {"{": "}", "[": "]"}
+CLOSERS = {"}", "]"}
+
+
+class IncrementalJSONValidator:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.status = PENDING
+        self.reason: Optional[str] = None
+        self.first_field_at: Optional[float] = None
+        self._chunks = []
+        self._raw = []
+        self._prefix = ""        # text seen before the opening brace
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._end = None         # length of the JSON text once complete
+        self._length = 0
+
+    @property
+    def text(self) -> str:
+        """The JSON object text (without any leading code fence)"""
+        body = "".join(self._chunks)
+        return body[:self._end] if self._end is not None else body
+
+    @property
+    def raw(self) -> str:
+        """Everything fed so far, including any prefix or trailing text"""
+        return "".join(self._raw)
+
+    def _fail(self, reason: str) -> str:
+        self.status = INVALID
+        self.reason = reason
+        return self.status
+
+    def feed(self, chunk: str) -> str:
+        if self.status != PENDING:
+            return self.status
+        self._raw.append(chunk)
+        if not self._stack:
+            # still looking for the opening brace; tolerate whitespace and a ```json fence
+            self._prefix += chunk
+            stripped = self._prefix.lstrip()
+            if stripped.startswith("```"):
+                if "\n" not in stripped:
+                    return self.status
+                stripped = stripped.split("\n", 1)[1].lstrip()
+            elif "```".startswith(stripped):
+                return self.status
+            if not stripped:
+                return self.status
+            if stripped[0] != "{":
+                return self._fail(f"expected '{{' but output starts with {stripped[:20]!r}")
+            chunk = stripped
+            self._prefix = ""
+        self._chunks.append(chunk)
+        for offset, char in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in OPENERS:
+                self._stack.append(OPENERS[char])
+            elif char in CLOSERS:
+                if not self._stack or self._stack.pop() != char:
+                    return self._fail(f"mismatched {char!r}")
+                if len(self._stack) == 1 and self.first_field_at is None:
+                    self.first_field_at = self.clock() - self.started
+                if not self._stack:
+                    self._end = self._length + offset + 1
+                    if self.first_field_at is None:
+                        self.first_field_at = self.clock() - self.started
+                    self.status = COMPLETE
+                    return self.status
+            elif char == "," and len(self._stack) == 1 and self.first_field_at is None:
+                self.first_field_at = self.clock() - self.started
+        self._length += len(chunk)
+        return self.status
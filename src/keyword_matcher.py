@@ -0,0 +1,148 @@
+'''
+Single-pass multi-keyword matching for TruthWeaver.
+
+KeywordAutomaton is an Aho-Corasick automaton over plain substrings. It is
+compiled once, into a DFA with the failure links already folded in, and then
+finds every occurrence of every keyword (overlapping ones included) in one scan
+of the text. The cost grows with text length plus the number of hits, not with
+text length times keyword count.
+
+KeywordIndex scans a shadow's sessions in one pass and records every hit as
+(category, keyword, session, offset), so the extractors can all answer their
+"does any of these words occur" questions from the same hits.
+
+SessionText is the joined lowercased text and the mapping from offsets in it
+back to (session, offset within session).
+'''
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+
+class KeywordAutomaton:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(dict.fromkeys(p for p in patterns if p))
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = goto[state][char] = len(goto)
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(index)
+
+        # breadth-first: a state's failure target is always finished before the state itself
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            out[state] = out[state] + out[fail[state]]
+            for char, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(char, 0) if state else 0
+                queue.append(child)
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(start offset, pattern index) for every occurrence, in order of end offset"""
+        delta, out, patterns = self._delta, self._out, self.patterns
+        state = 0
+        for position, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if out[state]:
+                for index in out[state]:
+                    yield position - len(patterns[index]) + 1, index
+
+
+class SessionText:
+    """' '.join(sessions).lower(), plus where each session starts in it"""
+
+    def __init__(self, sessions: List[str]):
+        # lowercasing one session at a time and joining with a space gives the same text as
+        # ' '.join(sessions).lower(), and the session starts fall out of the lengths
+        self.sessions = [session.lower() for session in sessions]
+        self.starts: List[int] = []
+        cursor = 0
+        for text in self.sessions:
+            self.starts.append(cursor)
+            cursor += len(text) + 1
+        self.text = ' '.join(self.sessions)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def locate(self, start: int, end: int) -> Tuple[int, int, bool]:
+        """(session, offset within it, whether [start, end) stays inside that session)"""
+        session = bisect_right(self.starts, start) - 1
+        offset = start - self.starts[session]
+        return session, offset, end - self.starts[session] <= len(self.sessions[session])
+
+
+class KeywordHit(NamedTuple):
+    category: str
+    keyword: str
+    session: int        # 0-based session index the hit starts in
+    offset: int         # offset within that session's lowercased text
+    contained: bool     # False when the hit runs across the space joining two sessions
+
+
+class KeywordTable:
+    """Compiled (category, keyword) table; scan() returns the KeywordIndex for one shadow"""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        self.entries = list(entries)
+        self.automaton = KeywordAutomaton(keyword for _, keyword in self.entries)
+        self._owners: List[List[Tuple[str, str]]] = [[] for _ in self.automaton.patterns]
+        position = {pattern: i for i, pattern in enumerate(self.automaton.patterns)}
+        for category, keyword in self.entries:
+            owners = self._owners[position[keyword]]
+            if (category, keyword) not in owners:
+                owners.append((category, keyword))
+
+    def scan(self, sessions: List[str]) -> "KeywordIndex":
+        text = SessionText(sessions)
+        hits = []
+        for start, index in self.automaton.iter_matches(text.text):
+            # matches arrive by end offset, so starts aren't monotonic; locate() bisects
+            session, offset, contained = text.locate(start, start + len(self.automaton.patterns[index]))
+            for category, keyword in self._owners[index]:
+                hits.append(KeywordHit(category, keyword, session, offset, contained))
+        return KeywordIndex(hits, text)
+
+
+class KeywordIndex:
+    def __init__(self, hits: List[KeywordHit], text: SessionText):
+        self.hits = hits
+        self.text = text
+        self.session_count = len(text)
+        self._text: Dict[str, Set[str]] = {}
+        self._sessions: Dict[str, Set[int]] = {}
+        for hit in hits:
+            self._text.setdefault(hit.category, set()).add(hit.keyword)
+            if hit.contained:
+                self._sessions.setdefault(hit.category, set()).add(hit.session)
+
+    def in_text(self, category: str) -> bool:
+        """Any keyword of the category anywhere in the joined text"""
+        return category in self._text
+
+    def keywords(self, category: str) -> Set[str]:
+        return self._text.get(category, set())
+
+    def in_session(self, category: str, session: int) -> bool:
+        """Any keyword of the category inside one session"""
+        return session in self._sessions.get(category, ())
+
+    def sessions_with(self, category: str) -> List[int]:
+        return sorted(self._sessions.get(category, ()))
+
+    def for_category(self, category: str, session: Optional[int] = None) -> List[KeywordHit]:
+        return [h for h in self.hits if h.category == category and (session is None or h.session == session)]
@@ -8,8 +8,163 @@
 '''
 import sys
 import os
+import re
+import hashlib
+import argparse
+import time
+import json
+import asyncio
+import threading
+from collections import deque
 import ollama
 
+from transcript_io import iter_shadows, format_shadow_transcript, parse_shadow_transcript
+from disk_cache import DiskCache, DEFAULT_CACHE_ROOT, make_key
+from json_stream import IncrementalJSONValidator, PENDING, COMPLETE
+from model_router import ModelRouter
+# aliased: `metrics` is already the name of the stage 2 stream metrics below
+from metrics import metrics as run_metrics, instrumented
+
+# bump a stage's version whenever its prompt template changes, so cached responses stop matching
+PROMPT_VERSIONS={"propositions":2,"summary":2,"fused":1,"session_propositions":2}
+LLM_CACHE_DIR=os.environ.get("LLM_CACHE_DIR",os.path.join(DEFAULT_CACHE_ROOT,"llm"))
+LLM_CACHE_MB=256
+# LLM_CACHE=0 in the environment (or --no-cache) disables the response cache
+_cache_enabled=os.environ.get("LLM_CACHE","1")!="0"
+_response_cache=None
+call_stats={"llm_calls":0,"cache_hits":0}
+# pipeline.py calls stage 1 and stage 2 from separate threads
+_stats_lock=threading.Lock()
+# keep the model resident between shadows instead of Ollama's 5 minute default
+KEEP_ALIVE=os.environ.get("LLM_KEEP_ALIVE","30m")
+# set by configure_router (--route); None sends every call to the model it was given
+router=None
+# cache stages that share a routing budget with another stage
+ROUTED_STAGES={"session_propositions":"propositions"}
+EVAL_FIELDS=("prompt_eval_count","prompt_eval_duration","eval_count","eval_duration","load_duration","total_duration")
+eval_log=[]
+
+def configure_cache(enabled=True,directory=LLM_CACHE_DIR,max_mb=LLM_CACHE_MB):
+    global _cache_enabled,_response_cache
+    _cache_enabled=enabled
+    _response_cache=DiskCache(directory,max_mb*1024*1024) if enabled else None
+
+def configure_router(profiles=None,log_path=None,budgets=None):
+    global router
+    router=ModelRouter.from_benchmark(profiles,log_path=log_path) if profiles else ModelRouter(log_path=log_path)
+    for stage,seconds in (budgets or {}).items():
+        if seconds is not None:
+            router.set_budget(stage,seconds)
+    return router
+
+def route_model(stage,llm,messages,label):
+    # the routed model also goes into the cache key, so cached replies stay per model
+    if router is None:
+        return llm
+    return router.choose(ROUTED_STAGES.get(stage,stage),"".join(m["content"] for m in messages),label)
+
+def get_response_cache():
+    global _response_cache
+    if _cache_enabled and _response_cache is None:
+        _response_cache=DiskCache(LLM_CACHE_DIR,LLM_CACHE_MB*1024*1024)
+    return _response_cache if _cache_enabled else None
+
+def response_cache_key(stage,llm,content):
+    # model + prompt template version + hash of the variable part of the prompt
+    content_hash=hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return make_key("llm",stage,PROMPT_VERSIONS[stage],llm,content_hash)
+
+def record_eval_stats(label,response):
+    # Ollama reports token counts and nanosecond durations on the final response;
+    # a small prompt_eval_count means the system prefix came from the KV cache
+    stats={"label":label}
+    for field in EVAL_FIELDS:
+        stats[field]=response.get(field) or 0
+    eval_log.append(stats)
+    run_metrics.count("llm.prompt_tokens",stats["prompt_eval_count"])
+    run_metrics.count("llm.eval_tokens",stats["eval_count"])
+    if stats["eval_duration"]:
+        run_metrics.observe("llm.eval_tokens_per_second",stats["eval_count"]/(stats["eval_duration"]/1e9))
+    if stats["prompt_eval_duration"]:
+        run_metrics.observe("llm.prompt_tokens_per_second",stats["prompt_eval_count"]/(stats["prompt_eval_duration"]/1e9))
+    print(f"{label}: prompt eval {stats['prompt_eval_count']} tokens in {stats['prompt_eval_duration']/1e9:.2f}s, "
+          f"generation {stats['eval_count']} tokens in {stats['eval_duration']/1e9:.2f}s")
+    return stats
+
+def count_call(stat):
+    with _stats_lock:
+        call_stats[stat]+=1
+
+def eval_summary():
+    totals={field:sum(stats[field] for stats in eval_log) for field in EVAL_FIELDS}
+    totals["calls"]=len(eval_log)
+    return totals
+
+def _cache_lookup(stage,llm,content,label):
+    # returns (key, cached reply or None); key is None when caching is off
+    cache=get_response_cache()
+    if cache is None:
+        return None,None
+    key=response_cache_key(stage,llm,content)
+    cached=cache.get(key)
+    if cached is not None:
+        count_call("cache_hits")
+        run_metrics.count(f"llm.{stage}.cache_hits")
+        print(f"{label} response loaded from cache.")
+        return key,cached["content"]
+    return key,None
+
+def _cache_store(key,stage,llm,reply):
+    if key is not None:
+        get_response_cache().put(key,{"model":llm,"stage":stage,"content":reply})
+
+def cached_chat(stage,llm,content,messages,label,format=None):
+    return _cached_chat(stage,llm,content,messages,label,format)[0]
+
+def _cached_chat(stage,llm,content,messages,label,format=None):
+    # (reply, whether it was generated rather than read from the cache)
+    llm=route_model(stage,llm,messages,label)
+    key,reply=_cache_lookup(stage,llm,content,label)
+    if reply is not None:
+        return reply,False
+    print(f"sending {label} to llm...")
+    with run_metrics.timer(f"llm.{stage}"):
+        response=ollama.chat(model=llm,messages=messages,keep_alive=KEEP_ALIVE,format=format)
+    count_call("llm_calls")
+    run_metrics.count(f"llm.{stage}.calls")
+    record_eval_stats(label,response)
+    reply=response["message"]["content"]
+    _cache_store(key,stage,llm,reply)
+    return reply,True
+
+async def acached_chat(client,semaphore,stage,llm,content,messages,label,format=None):
+    llm=route_model(stage,llm,messages,label)
+    key,reply=_cache_lookup(stage,llm,content,label)
+    if reply is not None:
+        return reply
+    # the semaphore bounds requests in flight against the Ollama server, not shadows
+    async with semaphore:
+        print(f"sending {label} to llm...")
+        # timed inside the semaphore: request latency, not time spent queued behind other shadows
+        with run_metrics.timer(f"llm.{stage}"):
+            response=await client.chat(model=llm,messages=messages,keep_alive=KEEP_ALIVE,format=format)
+    count_call("llm_calls")
+    run_metrics.count(f"llm.{stage}.calls")
+    record_eval_stats(label,response)
+    reply=response["message"]["content"]
+    _cache_store(key,stage,llm,reply)
+    return reply
+
+def iter_transcripts(file):
+    # .jsonl session records (main.py --jsonl) -> one transcript per shadow, streamed;
+    # any other file is a single free-text transcript in the format below
+    if file.endswith(".jsonl"):
+        for shadow_id,records in iter_shadows(file):
+            yield shadow_id,format_shadow_transcript(shadow_id,records)
+        return
+    with open(file,"r",encoding="utf-8") as f:
+        yield None,f.read()
+
 def read_transcript_to_generate_propositions(file,llm="mistral"):
     #input file is in this format:
     '''
@@ -28,7 +183,11 @@ def read_transcript_to_generate_propositions(file,llm="mistral"):
     with open(file,"r",encoding="utf-8") as f:
         transcript=f.read()
     print("transcript read from file.")
-    prompt=f"""
+    return generate_propositions(transcript,llm)
+
+# Static instructions and few-shot example go in the system message and only the transcript
+# varies, so Ollama can reuse the evaluated prefix (KV cache) across calls.
+PROPOSITIONS_SYSTEM_PROMPT="""
     You are a transcript parser. 
     I will give you a transcript of 5 paragraphs containing messy phrasing and incomplete sentences. 
 
@@ -89,20 +248,92 @@ def read_transcript_to_generate_propositions(file,llm="mistral"):
     I am not a devops engineer.
     I want to be a devops engineer.
 
-    Transcript:
-    {transcript}
     """
-    print("sending prompt-1 to llm...")
-    response=ollama.chat(
-        model=llm,
-        messages=[
-            {"role":"user","content":prompt}
+
+SESSION_PROPOSITIONS_SYSTEM_PROMPT="""
+    You are a transcript parser. 
+    I will give you ONE session of an interview transcript, a single paragraph containing messy phrasing and incomplete sentences. 
+
+    Format of the session:
+    shadow_id:"string"
+    N.
+    The paragraph of session N.
+
+    Your task is to extract and rewrite the paragraph into a clean list of simple propositional statements. 
+
+    Rules:
+    - Statements must be SHORT and DIRECT.
+    - Use formats like: "I will do X.", "I will not do X.", "I have Y years of experience.", "I managed this.", "I code in Y.", etc.
+    - DO NOT summarize. DO NOT add extra meaning. 
+    - RETAIN every claim made in the paragraph, EVEN IF CONTRADICTORY.
+    - If the speaker is uncertain, add "(uncertainty because of the 'word')" at the end of the statement.
+    - If the speaker is denying something, make sure to include that as a separate statement.
+    - Output exactly one numbered block, for the session you were given. Do not number the statements and do not invent other sessions.
+    
+    Example Input:
+    shadow_id:"atlas_2025"
+    5.
+    Okay, it was an internship, it was a summer internship, and I mostly just watched the senior engineers work. I ran some scripts they gave me. I'm not a DevOps engineer, I just want to be one.
+
+    Example Output: 
+    shadow_id:"atlas_2025"
+    5.
+    I was an intern during a summer internship.
+    I just watched senior engineers work.
+    I ran scripts given to me.
+    I am not a devops engineer.
+    I want to be a devops engineer.
+
+    """
+
+def session_propositions_messages(transcript : str):
+    return [
+            {"role":"system","content":SESSION_PROPOSITIONS_SYSTEM_PROMPT},
+            {"role":"user","content":f"Session:\n{transcript}"}
         ]
-    )
+
+def propositions_messages(transcript : str):
+    return [
+            {"role":"system","content":PROPOSITIONS_SYSTEM_PROMPT},
+            {"role":"user","content":f"Transcript:\n{transcript}"}
+        ]
+
+def generate_propositions(transcript : str,llm="mistral"):
+    reply=cached_chat("propositions",llm,transcript,propositions_messages(transcript),"prompt-1")
     print("propositions received from llm.")
-    return response["message"]["content"]
-def read_propositions_to_generate_json_summary(propositions : str,llm="mistral"):
-    prompt="""
+    return reply
+
+def session_transcript(shadow_id,session,text):
+    if shadow_id is None:
+        return f"{session}.\n{text}"
+    return format_shadow_transcript(shadow_id,[{"session":session,"text":text}])
+
+def session_propositions_block(session,reply):
+    # one session's stage 1 reply -> its lines under a "N." header, whatever header/numbering the model echoed;
+    # every bare "N." line goes, so extra blocks in the reply can't turn into fake sessions in the merge
+    lines=[line for line in reply.strip().splitlines()
+           if line.strip() and not line.strip().startswith("shadow_id:") and not re.fullmatch(r"\d+\.",line.strip())]
+    return [f"{session}."]+lines
+
+def merge_session_propositions(shadow_id,blocks):
+    header=[f'shadow_id:"{shadow_id}"'] if shadow_id is not None else []
+    return "\n".join(header+[line for block in blocks for line in block])
+
+def generate_propositions_incremental(transcript : str,llm="mistral"):
+    # Stage 1 one session paragraph at a time, each cached on its own: when a new session lands
+    # only that paragraph is sent, and the merged list is rebuilt from the cached ones.
+    shadow_id,sessions=parse_shadow_transcript(transcript)
+    generated=0
+    blocks=[]
+    for session,text in sessions:
+        part=session_transcript(shadow_id,session,text)
+        reply,sent=_cached_chat("session_propositions",llm,part,session_propositions_messages(part),f"prompt-1 (session {session})")
+        generated+=sent
+        blocks.append(session_propositions_block(session,reply))
+    print(f"propositions for {len(sessions)} sessions, {generated} generated.")
+    return merge_session_propositions(shadow_id,blocks)
+
+SUMMARY_SYSTEM_PROMPT="""
     You are a truth-extraction engine. 
     You will be given a list of propositional statements made by a single speaker, across 5 sessions.
 
@@ -204,31 +435,412 @@ def read_propositions_to_generate_json_summary(propositions : str,llm="mistral")
 
     NOTE: OUTPUT STRICTLY THE JSON AND NOTHING ELSE, NO EXTRA TEXT, NO EXPLANATIONS, NO "JSON OUTPUT:", JUST THE RAW JSON
 
-    Statements:
-    """+propositions
-    print("sending prompt-2 to llm...")
-    response=ollama.chat(
-        model=llm,
-        messages=[
-            {"role":"user","content":prompt}
+    """
+
+def summary_messages(propositions : str):
+    return [
+            {"role":"system","content":SUMMARY_SYSTEM_PROMPT},
+            {"role":"user","content":"Statements:\n"+propositions}
         ]
-    )   
+
+def read_propositions_to_generate_json_summary(propositions : str,llm="mistral"):
+    reply=cached_chat("summary",llm,propositions,summary_messages(propositions),"prompt-2")
     print("json summary received from llm.")
-    return response["message"]["content"]
+    return reply
 
-if __name__=="__main__":
-    if(len(sys.argv)!=2):
-        print("usage: python llm.py input_transcript.txt ; ensure input_transcript.txt is in the same directory")
-        sys.exit(1)
-    input_file=sys.argv[1]
-    propositions=read_transcript_to_generate_propositions(input_file,"mistral")
-    print("propositions generated:")
-    print(propositions)
-    json_summary=read_propositions_to_generate_json_summary(propositions,"mistral")
-    print("json summary generated:")
-    print(json_summary)
+# JSON schema of the stage 2 output; passed as Ollama's `format` in fused mode so decoding is
+# constrained to it, and used to validate replies in every mode
+SUMMARY_SCHEMA={
+    "type":"object",
+    "properties":{
+        "shadow_id":{"type":"string"},
+        "revealed_truth":{
+            "type":"object",
+            "properties":{
+                "programming_experience":{"type":"string"},
+                "programming_language":{"type":"string"},
+                "skill_mastery":{"type":"string"},
+                "leadership_claims":{"type":"string"},
+                "team_experience":{"type":"string"},
+                "skills and other keywords":{"type":"array","items":{"type":"string"}},
+            },
+            "required":["programming_experience","programming_language","skill_mastery","leadership_claims","team_experience","skills and other keywords"],
+        },
+        "deception_patterns":{
+            "type":"array",
+            "items":{
+                "type":"object",
+                "properties":{
+                    "lie_type":{"type":"string"},
+                    "contradictory_claims":{"type":"array","items":{"type":"string"}},
+                },
+                "required":["lie_type","contradictory_claims"],
+            },
+        },
+    },
+    "required":["shadow_id","revealed_truth","deception_patterns"],
+}
+JSON_TYPES={"object":dict,"array":list,"string":str}
+
+def _check_schema(value,schema,path="$"):
+    expected=JSON_TYPES[schema["type"]]
+    if not isinstance(value,expected):
+        raise ValueError(f"{path} should be {schema['type']}, got {type(value).__name__}")
+    if schema["type"]=="object":
+        for key in schema.get("required",[]):
+            if key not in value:
+                raise ValueError(f"{path} is missing '{key}'")
+        for key,subschema in schema.get("properties",{}).items():
+            if key in value:
+                _check_schema(value[key],subschema,f"{path}.{key}")
+    elif schema["type"]=="array":
+        for i,item in enumerate(value):
+            _check_schema(item,schema["items"],f"{path}[{i}]")
+
+def validate_summary(text : str):
+    # parsed summary, or ValueError naming the first schema violation
+    try:
+        data=json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"not valid JSON: {e}") from e
+    _check_schema(data,SUMMARY_SCHEMA)
+    return data
+
+FUSED_SYSTEM_PROMPT="""
+    You are a truth-extraction engine. 
+    You will be given a raw transcript of 5 sessions with a single speaker, containing messy phrasing and incomplete sentences.
+
+    Format of the transcript:
+    shadow_id:"string"
+    1.
+    First paragraph of the transcript.
+    ...
+    5.
+    Fifth paragraph of the transcript.
+
+    Work in two steps, but ONLY output the result of the second step.
+
+    Step 1: rewrite every claim in each session as a SHORT and DIRECT propositional statement,
+    like "I have Y years of experience.", "I managed this.", "I code in Y.", "I am not X.".
+    - RETAIN every claim, EVEN IF CONTRADICTORY TO PREVIOUS STATEMENTS.
+    - If the speaker is uncertain ("maybe", "probably"), mark the statement as uncertain.
+    - Keep denials as separate statements.
+
+    Step 2: analyze the statements across sessions. The sessions have a general trend:
+    • Session 1: Confident lies told with practiced ease 
+    • Session 2: Small cracks appear as pressure mounts 
+    • Session 3: Desperate elaboration of false stories 
+    • Session 4: Truth and lies become tangled as panic sets in 
+    • Session 5: Final revelations mixed with last-ditch deceptions
+
+    NOTE: THIS TREND ISN'T FIXED, IT MIGHT BE THAT THE INTERACTION MIGHT ACTUALLY BE WITH A TRUTHFUL PERSON, OR A MIXTURE OF TRUTH AND LIES, SO DO NOT ASSUME THE TREND IS ALWAYS FOLLOWED. IT SHOULD ONLY BE USED AS A GUIDELINE.
+
+    Rules:
+    - If two statements contradict, assume the LAST one is true, and the earlier one is a lie
+    (later statements degrade in value, like from "managed" and "seasoned engineer" to "intern").
+    - If a statement is vague or uncertain, treat it as a lie.
+    - Do NOT invent facts not present.
+    - Mark all non-contradictory statements as true and use them for filling the json.
+
+    Example Input:
+    shadow_id:"atlas_2025"
+    1.
+    I'm a seasoned DevOps engineer specializing in Kubernetes. For the past year, I've been in the trenches, managing our production clusters, personally responsible for our entire networking and security posture.
+    2.
+    Why Calico? Ha! What else would you use? It's the only serious choice for network policy enforcement at scale. I wrote all our policies from scratch to ensure total service isolation.
+    3.
+    I'd check the logs. Then maybe the core DNS logs. I'd probably just restart the pod, that usually fixes things.
+    4.
+    The senior engineer usually handles the network debugging, I just deploy the yaml files he gives me.
+    5.
+    Okay, it was an internship, it was a summer internship, and I mostly just watched the senior engineers work. I ran some scripts they gave me. I'm not a DevOps engineer, I just want to be one.
+
+    Example Output:
+    {
+        "shadow_id":"atlas_2025",
+        "revealed_truth":{
+            "programming_experience":"0-2 years",
+            "programming_language":"calico",
+            "skill_mastery":"basic-intermediate",
+            "leadership_claims":"fabricated",
+            "team_experience":"worked with senior managers",
+            "skills and other keywords":["calico","DNS logs"]
+        },
+        "deception_patterns":[
+            {
+                "lie_type": "leadership_inflation",
+                "contradictory_claims":["managed","intern"]
+            }
+        ]
+    }
+
+    NOTE: OUTPUT STRICTLY THE JSON AND NOTHING ELSE, NO EXTRA TEXT, NO EXPLANATIONS, JUST THE RAW JSON
+
+    """
+
+def fused_messages(transcript : str):
+    return [
+            {"role":"system","content":FUSED_SYSTEM_PROMPT},
+            {"role":"user","content":f"Transcript:\n{transcript}"}
+        ]
+
+def fused_json_summary(transcript : str,llm="mistral"):
+    # one schema-constrained call straight from transcript to summary; falls back to the
+    # two-stage path when the reply doesn't validate
+    reply=cached_chat("fused",llm,transcript,fused_messages(transcript),"fused prompt",format=SUMMARY_SCHEMA)
+    try:
+        validate_summary(reply)
+        print("json summary received from llm (fused).")
+        return reply
+    except ValueError as e:
+        print(f"fused summary failed validation ({e}); falling back to two stages.")
+        return read_propositions_to_generate_json_summary(generate_propositions(transcript,llm),llm)
+
+def compare_modes(transcript : str,llm="mistral"):
+    # wall time and schema validity of both modes on the same transcript, plus how much they agree;
+    # run with the cache disabled for meaningful timings
+    report={}
+    outputs={}
+    replies={}
+    for mode in ("two-stage","fused"):
+        started=time.perf_counter()
+        if mode=="fused":
+            reply=cached_chat("fused",llm,transcript,fused_messages(transcript),"fused prompt",format=SUMMARY_SCHEMA)
+        else:
+            reply=read_propositions_to_generate_json_summary(generate_propositions(transcript,llm),llm)
+        elapsed=time.perf_counter()-started
+        replies[mode]=reply
+        try:
+            outputs[mode]=validate_summary(reply)
+            error=None
+        except ValueError as e:
+            outputs[mode]=None
+            error=str(e)
+        report[mode]={"seconds":round(elapsed,2),"valid":error is None,"error":error}
+    if outputs["two-stage"] and outputs["fused"]:
+        a,b=outputs["two-stage"]["revealed_truth"],outputs["fused"]["revealed_truth"]
+        fields=[k for k in SUMMARY_SCHEMA["properties"]["revealed_truth"]["required"] if k!="skills and other keywords"]
+        report["matching_truth_fields"]=sum(str(a[k]).strip().lower()==str(b[k]).strip().lower() for k in fields)
+        lies_a={p["lie_type"] for p in outputs["two-stage"]["deception_patterns"]}
+        lies_b={p["lie_type"] for p in outputs["fused"]["deception_patterns"]}
+        report["lie_type_overlap"]=round(len(lies_a&lies_b)/len(lies_a|lies_b),2) if lies_a|lies_b else 1.0
+    print(f"mode comparison: {json.dumps(report)}")
+    # the summary written out is the default mode's when it validated, then fused; raw text only if neither did
+    for mode in ("two-stage","fused"):
+        if outputs[mode]:
+            return report,json.dumps(outputs[mode])
+    return report,replies["two-stage"]
+
+class JSONStreamAborted(ValueError):
+    def __init__(self,reason,partial,metrics):
+        super().__init__(reason)
+        self.partial=partial
+        self.metrics=metrics
+
+def stream_json_summary(propositions : str,llm="mistral"):
+    # Stage 2 with stream=True: tokens are checked as they arrive and generation is cut off
+    # as soon as the output can no longer be a JSON object. Once the object closes, the rest of
+    # the stream is read only for the final chunk's eval stats (record_eval_stats).
+    # Returns (json_text, metrics); raises JSONStreamAborted with the partial output otherwise.
+    llm=route_model("summary",llm,summary_messages(propositions),"prompt-2")
+    key,reply=_cache_lookup("summary",llm,propositions,"prompt-2")
+    if reply is not None:
+        return reply,{"cached":True}
+    print("streaming prompt-2 from llm...")
+    validator=IncrementalJSONValidator()
+    first_token=None
+    status=PENDING
+    stream=ollama.chat(model=llm,messages=summary_messages(propositions),stream=True,keep_alive=KEEP_ALIVE)
+    count_call("llm_calls")
+    run_metrics.count("llm.summary.calls")
+    completed_at=None
+    try:
+        for chunk in stream:
+            if chunk.get("done"):
+                record_eval_stats("prompt-2",chunk)
+            if status==COMPLETE:
+                # the object has closed; read on to the final chunk for its eval stats, dropping any trailing tokens
+                continue
+            piece=chunk["message"]["content"]
+            if piece and first_token is None:
+                first_token=time.perf_counter()-validator.started
+            status=validator.feed(piece)
+            if status==COMPLETE:
+                completed_at=time.perf_counter()
+            elif status!=PENDING:
+                break
+    finally:
+        # closing the stream drops the connection, which stops generation on the server
+        close=getattr(stream,"close",None)
+        if close is not None:
+            close()
+    metrics={
+        "cached":False,
+        "time_to_first_token":round(first_token,3) if first_token is not None else None,
+        "time_to_first_field":round(validator.first_field_at,3) if validator.first_field_at is not None else None,
+        "total_time":round((completed_at or time.perf_counter())-validator.started,3),
+        "status":status,
+        "chars":len(validator.raw),
+    }
+    run_metrics.add_time("llm.summary",metrics["total_time"])
+    if metrics["time_to_first_token"] is not None:
+        run_metrics.observe("llm.summary.time_to_first_token",metrics["time_to_first_token"])
+    if status!=COMPLETE:
+        raise JSONStreamAborted(validator.reason or "stream ended before the JSON object closed",validator.raw,metrics)
+    text=validator.text
+    try:
+        json.loads(text)
+        metrics["parses"]=True
+    except json.JSONDecodeError:
+        metrics["parses"]=False
+    _cache_store(key,"summary",llm,text)
+    return text,metrics
+
+async def aprocess_transcript(client,semaphore,shadow_id,transcript,llm="mistral",mode="two-stage",incremental=False):
+    label=shadow_id or "transcript"
+    if mode=="fused":
+        reply=await acached_chat(client,semaphore,"fused",llm,transcript,fused_messages(transcript),f"fused prompt ({label})",format=SUMMARY_SCHEMA)
+        try:
+            validate_summary(reply)
+            return reply
+        except ValueError as e:
+            print(f"fused summary for {label} failed validation ({e}); falling back to two stages.")
+    if incremental:
+        parsed_id,sessions=parse_shadow_transcript(transcript)
+        parts=[session_transcript(parsed_id,session,text) for session,text in sessions]
+        replies=await asyncio.gather(*(acached_chat(client,semaphore,"session_propositions",llm,part,session_propositions_messages(part),
+                                                     f"prompt-1 ({label}, session {session})")
+                                       for part,(session,_) in zip(parts,sessions)))
+        propositions=merge_session_propositions(parsed_id,[session_propositions_block(session,reply)
+                                                           for (session,_),reply in zip(sessions,replies)])
+    else:
+        propositions=await acached_chat(client,semaphore,"propositions",llm,transcript,propositions_messages(transcript),f"prompt-1 ({label})")
+    return await acached_chat(client,semaphore,"summary",llm,propositions,summary_messages(propositions),f"prompt-2 ({label})")
+
+def write_summaries(input_file,summaries):
     base,ext=input_file.rsplit('.',1)
     output_file=f"{base}_json.txt"
     with open(output_file,"w",encoding="utf-8") as f:
-        f.write(json_summary)
-    
\ No newline at end of file
+        f.write("\n".join(summaries))
+    return output_file
+
+async def abatch(input_files,llm="mistral",concurrency=2,window=None,mode="two-stage",incremental=False):
+    # Every shadow runs stage 1 -> stage 2 as its own task, so stage 1 of the next shadow
+    # overlaps stage 2 of the current one. Shadows from all input files share one window, so
+    # one shadow per file still keeps `concurrency` requests in flight; at most `window` shadows
+    # are in memory. Each file's summaries are written in input order once its last shadow is done.
+    client=ollama.AsyncClient()
+    semaphore=asyncio.Semaphore(concurrency)
+    window=window or concurrency*2
+    output_files=[]
+    summaries={}
+    # (input_file, task), plus (input_file, None) after a file's last shadow
+    pending=deque()
+    running=0
+
+    def flush_finished():
+        while pending and pending[0][1] is None:
+            input_file,_=pending.popleft()
+            output_file=write_summaries(input_file,summaries.pop(input_file))
+            print(f"json summaries saved to {output_file}")
+            output_files.append(output_file)
+
+    async def finish_oldest():
+        nonlocal running
+        input_file,task=pending.popleft()
+        running-=1
+        summaries[input_file].append(await task)
+        flush_finished()
+
+    for input_file in input_files:
+        summaries[input_file]=[]
+        for shadow_id,transcript in iter_transcripts(input_file):
+            pending.append((input_file,asyncio.create_task(aprocess_transcript(client,semaphore,shadow_id,transcript,llm,mode,incremental))))
+            running+=1
+            if running>=window:
+                await finish_oldest()
+        pending.append((input_file,None))
+        flush_finished()
+    while pending:
+        await finish_oldest()
+    return output_files
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Transcript -> propositions -> JSON summary with a local LLM")
+    parser.add_argument("input_files",nargs="+",help="input_transcript.txt or input_transcript.jsonl (several files run as an async batch)")
+    parser.add_argument("--batch",action="store_true",help="use the async batch mode even for a single file")
+    parser.add_argument("--concurrency",type=int,default=2,help="batch mode: max LLM requests in flight")
+    parser.add_argument("--mode",choices=["two-stage","fused","compare"],default="two-stage",
+                        help="fused: one schema-constrained call per shadow (falls back to two stages if invalid); compare: run both and report")
+    parser.add_argument("--model",default="mistral",help="model for every call (the fallback when routing is off)")
+    parser.add_argument("--route",action="store_true",help="pick the model per stage from prompt length and the latency budgets")
+    parser.add_argument("--budget-propositions",type=float,help="routing: latency budget in seconds for stage 1")
+    parser.add_argument("--budget-summary",type=float,help="routing: latency budget in seconds for stage 2 (and fused mode)")
+    parser.add_argument("--route-profiles",help="routing: bench_llm.py report to take model throughput from")
+    parser.add_argument("--route-log",help="routing: append every decision to this JSONL file")
+    parser.add_argument("--incremental",action="store_true",help="run stage 1 per session paragraph and cache each, so only new sessions are sent")
+    parser.add_argument("--stream",action="store_true",help="stream stage 2, stop early on invalid output and report time-to-first-field")
+    parser.add_argument("--keep-alive",default=KEEP_ALIVE,help="how long Ollama keeps the model loaded after each call (e.g. 30m; a negative duration such as -1m keeps it loaded)")
+    parser.add_argument("--no-cache",action="store_true",help="always call the LLM, ignoring cached responses")
+    parser.add_argument("--cache-dir",default=LLM_CACHE_DIR)
+    parser.add_argument("--cache-size-mb",type=int,default=LLM_CACHE_MB)
+    parser.add_argument("--metrics",help="write per-stage timers, call/cache counters and tokens/sec as JSON to this path")
+    parser.add_argument("--profile",help="run under cProfile and save the stats to this path")
+    args=parser.parse_args()
+    batch=args.batch or len(args.input_files)>1
+    if batch and args.stream:
+        parser.error("--stream only applies to a single input file without --batch")
+    if batch and args.mode=="compare":
+        parser.error("--mode compare only applies to a single input file without --batch")
+    configure_cache(_cache_enabled and not args.no_cache,args.cache_dir,args.cache_size_mb)
+    KEEP_ALIVE=args.keep_alive
+    if args.route:
+        configure_router(args.route_profiles,args.route_log,{"propositions":args.budget_propositions,
+                                                             "summary":args.budget_summary,"fused":args.budget_summary})
+    with instrumented(args.metrics,args.profile):
+        if batch:
+            asyncio.run(abatch(args.input_files,args.model,args.concurrency,mode=args.mode,incremental=args.incremental))
+            print(f"llm calls: {call_stats['llm_calls']}, cache hits: {call_stats['cache_hits']}")
+            print(f"prompt eval totals: {json.dumps(eval_summary())}")
+            if router is not None:
+                print(f"routing: {json.dumps(router.summary())}")
+            sys.exit(0)
+        input_file=args.input_files[0]
+        summaries=[]
+        for shadow_id,transcript in iter_transcripts(input_file):
+            if shadow_id is not None:
+                print(f"processing {shadow_id}...")
+            if args.mode=="fused":
+                summaries.append(fused_json_summary(transcript,args.model))
+                print(summaries[-1])
+                continue
+            if args.mode=="compare":
+                report,json_summary=compare_modes(transcript,args.model)
+                summaries.append(json_summary)
+                continue
+            if args.incremental:
+                propositions=generate_propositions_incremental(transcript,args.model)
+            else:
+                propositions=generate_propositions(transcript,args.model)
+            print("propositions generated:")
+            print(propositions)
+            if args.stream:
+                try:
+                    json_summary,metrics=stream_json_summary(propositions,args.model)
+                except JSONStreamAborted as e:
+                    # the partial output is known not to be JSON: never write it, ask again without streaming
+                    print(f"stage 2 aborted: {e}; retrying without streaming")
+                    print(f"stage 2 metrics: {json.dumps(e.metrics)}")
+                    json_summary=read_propositions_to_generate_json_summary(propositions,args.model)
+                else:
+                    print(f"stage 2 metrics: {json.dumps(metrics)}")
+            else:
+                json_summary=read_propositions_to_generate_json_summary(propositions,args.model)
+            print("json summary generated:")
+            print(json_summary)
+            summaries.append(json_summary)
+        write_summaries(input_file,summaries)
+        print(f"llm calls: {call_stats['llm_calls']}, cache hits: {call_stats['cache_hits']}")
+        print(f"prompt eval totals: {json.dumps(eval_summary())}")
+        if router is not None:
+            print(f"routing: {json.dumps(router.summary())}")
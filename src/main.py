@@ -1,67 +1,153 @@
 import whisper
+import numpy as np
 from pydub import AudioSegment
 import os
 import json 
 import sys
+import re
+import glob
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor,as_completed
 from pathlib import Path
+
+from disk_cache import DiskCache, DEFAULT_CACHE_ROOT, make_key, file_digest
+import vad
+from word_timeline import WordTimeline
+from transcript_io import split_session_name, session_record, write_sessions
+from metrics import metrics, instrumented
+
+AUDIO_EXTENSIONS={".mp3",".wav",".m4a",".flac",".ogg",".webm",".mp4"}
 def preprocess_audio(file):
+    # resample/mono/peak-normalise entirely in memory: no temp wav, safe to run concurrently
     print(f"preprocess_audio: {file}")
     audio=AudioSegment.from_file(file)
-    normalized_audio=audio.set_frame_rate(16000).set_channels(1)
-    normalized_audio=normalized_audio.apply_gain(normalized_audio.max_dBFS)
-    temp_file="temp_normalized.wav"
-    normalized_audio.export(temp_file,format="wav")
-    print(f"Audio preprocessed and saved to {temp_file}")
-    return temp_file
+    normalized_audio=audio.set_frame_rate(whisper.audio.SAMPLE_RATE).set_channels(1).set_sample_width(2)
+    if normalized_audio.max_dBFS!=float("-inf"):
+        normalized_audio=normalized_audio.apply_gain(-normalized_audio.max_dBFS)
+    samples=np.array(normalized_audio.get_array_of_samples(),dtype=np.float32)
+    # int16 -> float32 in [-1, 1), the buffer format model.transcribe takes directly
+    return samples/32768.0
 
 def analyze_transcription(t):
-    analysis=[]
-    previous_end=0.0
-    if t['segments'] and t['segments'][0]['words']:
-        previous_word_end = t['segments'][0]['words'][0]['start']
-    words=[]
-    for seg in t['segments']:
-        words.extend(seg['words'])
-    for i,w in enumerate(words):
-        word=w['word'].strip()
-        start=w['start']
-        end=w['end']
-        pause_time=start-previous_end
-        is_stammer=False
-        if i>0:
-            prev_w=words[i-1]
-            prev_word=prev_w['word'].strip()
-            if word.lower()==prev_word.lower():
-                is_stammer=True
-        analysis.append({
-            'word': word,
-            'start': start,
-            'end': end,
-            'pause_before': round(pause_time,3),
-            'is_stammer': is_stammer
-        })
-        previous_end=end
-    return analysis
-def transcript_creator(input_file):
+    # columnar timeline: start/end/pause arrays, interned tokens, vectorized stammer and long-pause flags
+    return WordTimeline.from_transcription(t)
+
+MODEL_NAME="medium.en"
+VERBATIM_PROMPT="This is a verbatim transcript including all stammers, hesitations, and filler words."
+TRANSCRIBE_OPTIONS={"word_timestamps":True,"fp16":False,"initial_prompt":VERBATIM_PROMPT}
+# bump when preprocess_audio changes what the model sees, so stale cache entries stop matching
+PREPROCESS_VERSION=1
+TRANSCRIPTION_CACHE_DIR=os.environ.get("TRANSCRIPTION_CACHE_DIR",os.path.join(DEFAULT_CACHE_ROOT,"transcriptions"))
+
+def load_model(name=MODEL_NAME):
     print("Loading model...")
     # print(whisper.available_models())
-    model=whisper.load_model("medium.en")
+    with metrics.timer("main.load_model"):
+        model=whisper.load_model(name)
     print("Model loaded.")
-    # processed_audio=preprocess_audio(audio_file)
-    verbatim_prompt = "This is a verbatim transcript including all stammers, hesitations, and filler words."
+    return model
+
+def load_audio(input_file):
+    # float32 mono 16 kHz buffer, the format model.transcribe expects
+    with metrics.timer("main.load_audio"):
+        audio=preprocess_audio(input_file)
+    metrics.observe("main.audio_seconds",audio_duration(audio))
+    return audio
+
+def audio_duration(audio):
+    return len(audio)/whisper.audio.SAMPLE_RATE
+
+def transcribe(model,audio):
+    # real-time factor: decode seconds per second of audio, <1 is faster than real time
+    started=time.perf_counter()
+    result=model.transcribe(audio,**TRANSCRIBE_OPTIONS)
+    elapsed=time.perf_counter()-started
+    metrics.add_time("main.transcribe",elapsed)
+    metrics.observe("main.rtf",elapsed/max(audio_duration(audio),1e-9))
+    return result
+
+def open_transcription_cache(directory=TRANSCRIPTION_CACHE_DIR,max_mb=512):
+    return DiskCache(directory,max_mb*1024*1024)
+
+def transcription_cache_key(input_file,model_name=MODEL_NAME,variant=None):
+    # audio bytes + everything that changes the decode; the full result (segments, words) is stored
+    parts=["transcription",PREPROCESS_VERSION,file_digest(input_file),model_name,TRANSCRIBE_OPTIONS]
+    if variant is not None:
+        parts.append(variant)
+    return make_key(*parts)
+
+def cached_transcription(cache,input_file,model_name=MODEL_NAME,variant=None):
+    # returns (key, result); result is None on a miss
+    started=time.perf_counter()
+    key=transcription_cache_key(input_file,model_name,variant)
+    transcription=cache.get(key)
+    metrics.count("main.cache_misses" if transcription is None else "main.cache_hits")
+    if transcription is not None:
+        print(f"Cache hit for {input_file} ({(time.perf_counter()-started)*1000:.1f} ms)")
+    return key,transcription
+
+def transcribe_file(input_file,get_model,model_name=MODEL_NAME,cache=None):
+    # get_model is only called on a cache miss, so hits never load Whisper
+    key=None
+    if cache is not None:
+        key,transcription=cached_transcription(cache,input_file,model_name)
+        if transcription is not None:
+            return transcription
+    audio=load_audio(input_file)
+    model=get_model()
     print("Transcribing audio...")
-    transcription=model.transcribe(input_file,word_timestamps=True,fp16=False,initial_prompt=verbatim_prompt)
-    print("Transcription completed.")
-    print(transcription['text'].strip())
+    transcription=transcribe(model,audio)
+    if cache is not None:
+        cache.put(key,transcription)
+    return transcription
+
+def write_transcription(input_file,transcription):
     base,ext=input_file.rsplit('.',1)
     output_file=f"{base}_transcription.txt"
     with open(output_file,"w",encoding="utf-8") as f:
         f.write(f"{input_file}:\n")
         f.write(transcription['text'])
+    return output_file
+
+def write_timeline(input_file,transcription):
+    base,ext=input_file.rsplit('.',1)
+    output_file=f"{base}_timeline.npz"
+    analyze_transcription(transcription).save(output_file)
+    return output_file
+
+def write_jsonl(input_file,transcription):
+    # structured session record (shadow id, session, segments, words) for truth_weaver.py/llm.py
+    base,ext=input_file.rsplit('.',1)
+    output_file=f"{base}_transcription.jsonl"
+    write_sessions(output_file,[session_record(input_file,transcription)])
+    return output_file
+
+def write_outputs(input_file,transcription,timeline=False,jsonl=False):
+    output_file=write_transcription(input_file,transcription)
+    if timeline:
+        print(f"Word timeline saved to {write_timeline(input_file,transcription)}")
+    if jsonl:
+        print(f"Session record saved to {write_jsonl(input_file,transcription)}")
+    return output_file
+
+def transcript_creator(input_file,model=None,model_name=MODEL_NAME,cache=None,timeline=False,jsonl=False):
+    # pass a resident model (see whisper_server.py) to skip the per-call load
+    def get_model():
+        nonlocal model
+        if model is None:
+            model=load_model(model_name)
+        return model
+    transcription=transcribe_file(input_file,get_model,model_name,cache)
+    print("Transcription completed.")
+    print(transcription['text'].strip())
+    output_file=write_outputs(input_file,transcription,timeline,jsonl)
     print(f"Transcription saved to {output_file} in the same directory")
+    return transcription
     # detailed_analysis=analyze_transcription(transcription)
     
-    # for item in detailed_analysis:
+    # for item in detailed_analysis.records():
     #     if item['pause_before'] > 0.0:
     #         print(f"  -> Long pause before this word: {item['pause_before']}s")
     #     word_display = f"Word: '{item['word'].strip()}' (from {item['start']}s to {item['end']}s)"
@@ -70,13 +156,205 @@ def transcript_creator(input_file):
     #         word_display += "  <-- POTENTIAL STAMMER"
             
     #     print(word_display)
-    # os.remove(processed_audio)
+
+_worker_model=None
+_worker_model_name=MODEL_NAME
+_worker_cache=None
+_worker_timeline=False
+_worker_jsonl=False
+
+def _init_worker(model_name,threads,cache_dir=None,cache_mb=None,timeline=False,jsonl=False):
+    # cap intra-op threads so N workers don't each grab every core
+    global _worker_model,_worker_model_name,_worker_cache,_worker_timeline,_worker_jsonl
+    import torch
+    torch.set_num_threads(threads)
+    _worker_model=whisper.load_model(model_name)
+    _worker_model_name=model_name
+    _worker_timeline=timeline
+    _worker_jsonl=jsonl
+    if cache_dir is not None:
+        _worker_cache=open_transcription_cache(cache_dir,cache_mb)
+
+def _transcribe_worker(input_file):
+    transcription=transcribe(_worker_model,load_audio(input_file))
+    if _worker_cache is not None:
+        _worker_cache.put(transcription_cache_key(input_file,_worker_model_name),transcription)
+    output_file=write_outputs(input_file,transcription,_worker_timeline,_worker_jsonl)
+    # the worker's timers travel back with the result; the parent merges them
+    return input_file,session_record(input_file,transcription),output_file,metrics.drain()
+
+def stitch_transcriptions(chunks):
+    # chunks: [(offset_seconds, result)] in timeline order -> one result on the global timeline
+    frames_per_second=whisper.audio.SAMPLE_RATE/whisper.audio.HOP_LENGTH
+    segments=[]
+    for offset,result in chunks:
+        for seg in result['segments']:
+            seg=dict(seg)
+            seg['id']=len(segments)
+            seg['seek']=seg.get('seek',0)+int(round(offset*frames_per_second))
+            seg['start']=round(seg['start']+offset,2)
+            seg['end']=round(seg['end']+offset,2)
+            seg['words']=[dict(w,start=round(w['start']+offset,2),end=round(w['end']+offset,2)) for w in seg.get('words',[])]
+            segments.append(seg)
+    language=chunks[0][1].get('language') if chunks else None
+    return {"text":"".join(seg['text'] for seg in segments),"segments":segments,"language":language}
+
+def _transcribe_chunk(job):
+    index,offset,audio=job
+    return index,offset,transcribe(_worker_model,audio),metrics.drain()
+
+def transcribe_long(input_file,workers=None,threads=None,model_name=MODEL_NAME,chunk_seconds=30.0,cache=None):
+    # split on silence, decode chunks in parallel, shift every segment/word back onto the file's timeline
+    variant=("vad",chunk_seconds)
+    key=None
+    if cache is not None:
+        key,transcription=cached_transcription(cache,input_file,model_name,variant)
+        if transcription is not None:
+            return transcription
+    started=time.perf_counter()
+    audio=load_audio(input_file)
+    sample_rate=whisper.audio.SAMPLE_RATE
+    bounds=vad.split_on_silence(audio,sample_rate,chunk_seconds)
+    jobs=[(i,start/sample_rate,audio[start:end]) for i,(start,end) in enumerate(bounds)]
+    cores=os.cpu_count() or 1
+    workers=max(1,min(workers or max(1,cores//4),len(jobs) or 1))
+    threads=threads or max(1,cores//workers)
+    print(f"Split {audio_duration(audio):.0f}s of audio into {len(jobs)} chunks; decoding with {workers} workers x {threads} threads...")
+    if not jobs:
+        decoded=[]
+    elif workers==1:
+        model=load_model(model_name)
+        decoded=[(i,offset,transcribe(model,chunk)) for i,offset,chunk in jobs]
+    else:
+        context=multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers,mp_context=context,initializer=_init_worker,initargs=(model_name,threads)) as pool:
+            decoded=[]
+            for index,offset,result,snapshot in pool.map(_transcribe_chunk,jobs):
+                metrics.merge(snapshot)
+                decoded.append((index,offset,result))
+    transcription=stitch_transcriptions([(offset,result) for _,offset,result in sorted(decoded,key=lambda d:d[0])])
+    elapsed=time.perf_counter()-started
+    metrics.observe("main.long_rtf",elapsed/max(audio_duration(audio),1e-9))
+    print(f"Long-audio transcription completed in {elapsed:.1f}s (rtf {elapsed/max(audio_duration(audio),1e-9):.3f})")
+    if cache is not None:
+        cache.put(key,transcription)
+    return transcription
+
+def _natural_key(path):
+    # atlas_2025_2.mp3 sorts before atlas_2025_10.mp3
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)",path)]
+
+def collect_inputs(target):
+    if os.path.isdir(target):
+        files=[os.path.join(target,name) for name in os.listdir(target)]
+    else:
+        files=glob.glob(target)
+    files=[f for f in files if os.path.isfile(f) and os.path.splitext(f)[1].lower() in AUDIO_EXTENSIONS]
+    return sorted(files,key=_natural_key)
+
+def write_combined_transcript(results,output_file):
+    # same layout as transcript.txt: "clip.mp3: text" per line, blank line between shadows
+    lines=[]
+    previous_shadow=None
+    for input_file,text in results:
+        shadow,_=split_session_name(input_file)
+        if previous_shadow is not None and shadow!=previous_shadow:
+            lines.append("")
+        lines.append(f"{os.path.basename(input_file)}: {text.strip()}")
+        previous_shadow=shadow
+    with open(output_file,"w",encoding="utf-8") as f:
+        f.write("\n".join(lines)+"\n")
+    return output_file
+
+def batch_transcribe(target,workers=None,threads=None,model_name=MODEL_NAME,combined_file=None,cache=None,timeline=False,jsonl=False):
+    files=collect_inputs(target)
+    if not files:
+        print(f"No audio files found for {target}")
+        return []
+    started=time.perf_counter()
+    records={}
+    failed={}
+    pending=files
+    if cache is not None:
+        # resolve cache hits in the parent so workers (and their model loads) only exist for misses
+        pending=[]
+        for input_file in files:
+            _,transcription=cached_transcription(cache,input_file,model_name)
+            if transcription is None:
+                pending.append(input_file)
+            else:
+                print(f"Transcription saved to {write_outputs(input_file,transcription,timeline,jsonl)}")
+                records[input_file]=session_record(input_file,transcription)
+    if pending:
+        cores=os.cpu_count() or 1
+        workers=max(1,min(workers or max(1,cores//4),len(pending)))
+        threads=threads or max(1,cores//workers)
+        print(f"Transcribing {len(pending)} files with {workers} workers x {threads} threads...")
+        cache_args=(cache.directory,cache.max_bytes//(1024*1024)) if cache is not None else (None,None)
+        # spawn: forking a process that already initialised torch's thread pools can hang
+        context=multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers,mp_context=context,initializer=_init_worker,initargs=(model_name,threads)+cache_args+(timeline,jsonl)) as pool:
+            futures={pool.submit(_transcribe_worker,input_file):input_file for input_file in pending}
+            for future in as_completed(futures):
+                # one undecodable clip must not take the rest of the batch down with it
+                try:
+                    input_file,record,output_file,snapshot=future.result()
+                except Exception as e:
+                    failed[futures[future]]=f"{type(e).__name__}: {e}"
+                    print(f"Failed {futures[future]}: {failed[futures[future]]}")
+                    continue
+                metrics.merge(snapshot)
+                print(f"Transcription saved to {output_file}")
+                records[input_file]=record
+    elapsed=time.perf_counter()-started
+    metrics.count("main.files",len(files))
+    if failed:
+        metrics.count("main.failed_files",len(failed))
+        print(f"{len(failed)} of {len(files)} files failed:")
+        for input_file in files:
+            if input_file in failed:
+                print(f"  {input_file}: {failed[input_file]}")
+    done=[input_file for input_file in files if input_file in records]
+    if not done:
+        print("No transcriptions to combine")
+        return []
+    results=[(input_file,records[input_file]['text']) for input_file in done]
+    if combined_file is None:
+        combined_file=os.path.join(os.path.dirname(files[0]),"transcript.txt")
+    write_combined_transcript(results,combined_file)
+    print(f"Combined transcript saved to {combined_file}")
+    if jsonl:
+        combined_jsonl=os.path.splitext(combined_file)[0]+".jsonl"
+        write_sessions(combined_jsonl,(records[input_file] for input_file in done))
+        print(f"Combined session records saved to {combined_jsonl}")
+    print(f"Batch completed: {len(done)} of {len(files)} files in {elapsed:.1f}s ({len(done)/elapsed*60:.1f} files/minute)")
+    return results
 
 if __name__=="__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python main.py input.mp3; ensure input.mp3 is in the same directory")
-        sys.exit(1)
-    transcript_creator(sys.argv[1])
+    parser=argparse.ArgumentParser(description="Transcribe an audio file, or a directory/glob of session clips in batch mode")
+    parser.add_argument("input",help="input.mp3, a directory of clips, or a quoted glob such as 'clips/*.mp3'")
+    parser.add_argument("--workers",type=int,help="batch/long mode: worker processes (default: cores/4)")
+    parser.add_argument("--threads",type=int,help="batch/long mode: torch threads per worker (default: cores/workers)")
+    parser.add_argument("--long",action="store_true",help="single file: split on silence and decode chunks in parallel")
+    parser.add_argument("--chunk-seconds",type=float,default=30.0,help="long mode: target chunk length")
+    parser.add_argument("--combined",help="batch mode: combined transcript path (default: transcript.txt next to the clips)")
+    parser.add_argument("--timeline",action="store_true",help="also save the word timeline (pauses, stammers) as *_timeline.npz")
+    parser.add_argument("--jsonl",action="store_true",help="also save structured session records (segments, words) as *.jsonl")
+    parser.add_argument("--no-cache",action="store_true",help="always run Whisper, ignoring the transcription cache")
+    parser.add_argument("--cache-dir",default=TRANSCRIPTION_CACHE_DIR)
+    parser.add_argument("--cache-size-mb",type=int,default=512,help="evict least recently used entries above this size")
+    parser.add_argument("--metrics",help="write stage timers, counters and real-time factor as JSON to this path")
+    parser.add_argument("--profile",help="run under cProfile and save the stats to this path")
+    args=parser.parse_args()
+    cache=None if args.no_cache else open_transcription_cache(args.cache_dir,args.cache_size_mb)
+    with instrumented(args.metrics,args.profile):
+        if os.path.isfile(args.input) and args.long:
+            transcription=transcribe_long(args.input,args.workers,args.threads,chunk_seconds=args.chunk_seconds,cache=cache)
+            print(f"Transcription saved to {write_outputs(args.input,transcription,args.timeline,args.jsonl)}")
+        elif os.path.isfile(args.input):
+            transcript_creator(args.input,cache=cache,timeline=args.timeline,jsonl=args.jsonl)
+        else:
+            batch_transcribe(args.input,args.workers,args.threads,combined_file=args.combined,cache=cache,timeline=args.timeline,jsonl=args.jsonl)
     
     # audio_file="C:\\Users\\lolla\\Desktop\\audio_to_text\\AUDIO_FILES_HACKATHON\\INNOV8_3.0\\Evaluation_set\\audio\\atlas_2025_5.mp3"
     # # processed_audio=preprocess_audio(audio_file)
@@ -90,7 +368,7 @@ if __name__=="__main__":
 
     # detailed_analysis=analyze_transcription(transcription)
     
-    # for item in detailed_analysis:
+    # for item in detailed_analysis.records():
     #     if item['pause_before'] > 0.0:
     #         print(f"  -> Long pause before this word: {item['pause_before']}s")
     #     word_display = f"Word: '{item['word'].strip()}' (from {item['start']}s to {item['end']}s)"
@@ -0,0 +1,186 @@
+'''
+Lightweight in-process metrics shared by main.py, llm.py, truth_weaver.py and
+textToPropSentences.py: per-stage timers, counters, observed values (such as
+the Whisper real-time factor), plus an opt-in cProfile hook.
+
+    from metrics import metrics
+    with metrics.timer("llm.summary"):
+        ...
+    metrics.count("llm.cache_hits")
+    metrics.observe("main.rtf", 0.42)
+    metrics.export_json("run_metrics.json")
+
+Each scalar is kept as a running count/total/min/max, so recording is O(1)
+and memory does not grow with the run. Worker processes have their own
+registry. Ship snapshot() back with the result and merge() it in the parent.
+'''
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.timers: Dict[str, List[float]] = {}     # name -> [count, total, min, max] seconds
+        self.counters: Dict[str, int] = {}
+        self.values: Dict[str, List[float]] = {}     # name -> [count, total, min, max]
+
+    def _add(self, table: Dict[str, List[float]], name: str, value: float, count: int = 1):
+        with self._lock:
+            entry = table.get(name)
+            if entry is None:
+                table[name] = [count, value, value, value]
+            else:
+                entry[0] += count
+                entry[1] += value
+                entry[2] = min(entry[2], value)
+                entry[3] = max(entry[3], value)
+
+    @contextmanager
+    def timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(self.timers, name, time.perf_counter() - started)
+
+    def timed(self, name: str) -> Callable:
+        """Decorator form of timer()"""
+        def decorate(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def add_time(self, name: str, seconds: float):
+        self._add(self.timers, name, seconds)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float):
+        self._add(self.values, name, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Raw state, picklable, for merge() in another process"""
+        with self._lock:
+            return {
+                'timers': {k: list(v) for k, v in self.timers.items()},
+                'counters': dict(self.counters),
+                'values': {k: list(v) for k, v in self.values.items()},
+            }
+
+    def merge(self, snapshot: Dict[str, Any]):
+        with self._lock:
+            for table_name in ('timers', 'values'):
+                table = getattr(self, table_name)
+                for name, (count, total, low, high) in snapshot[table_name].items():
+                    entry = table.get(name)
+                    if entry is None:
+                        table[name] = [count, total, low, high]
+                    else:
+                        entry[0] += count
+                        entry[1] += total
+                        entry[2] = min(entry[2], low)
+                        entry[3] = max(entry[3], high)
+            for name, n in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def drain(self) -> Dict[str, Any]:
+        """snapshot() and reset(), for workers that report per task"""
+        with self._lock:
+            snapshot = {
+                'timers': self.timers,
+                'counters': self.counters,
+                'values': self.values,
+            }
+            self.timers, self.counters, self.values = {}, {}, {}
+        return snapshot
+
+    @staticmethod
+    def _stats(entry: List[float], digits: int = 6) -> Dict[str, float]:
+        count, total, low, high = entry
+        return {'count': int(count), 'total': round(total, digits), 'mean': round(total / count, digits) if count else 0.0,
+                'min': round(low, digits), 'max': round(high, digits)}
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'wall_seconds': round(time.time() - self.started, 3),
+                'timers': {k: self._stats(v) for k, v in sorted(self.timers.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'values': {k: self._stats(v) for k, v in sorted(self.values.items())},
+            }
+
+    def export_json(self, path: str) -> Dict[str, Any]:
+        summary = self.summary()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    def report(self) -> str:
+        """Human-readable table of the summary"""
+        summary = self.summary()
+        lines = [f"{'timer':<36}{'count':>8}{'total s':>11}{'mean ms':>11}{'max ms':>11}"]
+        for name, t in summary['timers'].items():
+            lines.append(f"{name:<36}{t['count']:>8}{t['total']:>11.3f}{t['mean'] * 1000:>11.2f}{t['max'] * 1000:>11.2f}")
+        for name, n in summary['counters'].items():
+            lines.append(f"{name:<36}{n:>8}")
+        for name, v in summary['values'].items():
+            lines.append(f"{name:<36}{v['count']:>8}  mean {v['mean']:.4g}  min {v['min']:.4g}  max {v['max']:.4g}")
+        return "\n".join(lines)
+
+
+# process-wide registry
+metrics = Metrics()
+
+
+@contextmanager
+def profiled(path: Optional[str] = None, top: int = 25):
+    """cProfile the block when path is set: dump stats to path and print the top functions"""
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(top)
+        print(stream.getvalue())
+        print(f"profile saved to {path} (open with `python -m pstats {path}` or snakeviz)")
+
+
+@contextmanager
+def instrumented(metrics_path: Optional[str] = None, profile_path: Optional[str] = None):
+    """Wrap a script's main work: optional cProfile, then print and export the metrics summary.
+
+    Both are opt-in; with neither path set the script's output is unchanged.
+    """
+    try:
+        with profiled(profile_path):
+            yield metrics
+    finally:
+        # also on sys.exit() and errors, so a failed run still leaves its numbers
+        if metrics_path or profile_path:
+            print(metrics.report())
+        if metrics_path:
+            metrics.export_json(metrics_path)
+            print(f"metrics saved to {metrics_path}")
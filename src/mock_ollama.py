@@ -0,0 +1,252 @@
+'''
+Deterministic local stand-in for the Ollama chat API, so bench_llm.py (and llm.py)
+can run with no models installed.
+
+- POST /api/chat   same request/response shape as Ollama, streamed or not
+- GET  /api/version
+
+Responses come from recorded fixtures when one matches the request (model +
+messages + format), otherwise they are synthesized from the prompt: stage 1
+gets the transcript sentences back one per line, stage 2 and fused mode get a
+schema-valid summary. Token counts and durations are derived from text length
+and the configured rates, so they are stable across runs but are NOT model
+measurements.
+
+Record real responses by proxying to a running Ollama:
+
+    python mock_ollama.py --upstream http://127.0.0.1:11434 --fixtures ../llm_fixtures
+    OLLAMA_HOST=http://127.0.0.1:11435 python bench_llm.py --models mistral
+
+then replay them offline with `python bench_llm.py --mock --fixtures ../llm_fixtures`.
+'''
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_HOST="127.0.0.1"
+DEFAULT_PORT=11435
+FIXTURE_DIR=os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","llm_fixtures")
+CREATED_AT="1970-01-01T00:00:00Z"
+# synthetic rates, tokens per second; ~4 characters per token
+PROMPT_RATE=400.0
+EVAL_RATE=40.0
+
+def fixture_key(request):
+    # keep_alive/options don't change the reply, so they stay out of the key
+    return hashlib.sha256(json.dumps([request.get("model"),request.get("messages"),request.get("format")],sort_keys=True).encode("utf-8")).hexdigest()
+
+def _sentences(text):
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+",text) if s.strip()]
+
+def _sections(body):
+    # "shadow_id:"x"\n1.\ntext\n2.\n..." -> (shadow_id, [(number, text), ...])
+    match=re.search(r'shadow_id:"([^"]*)"',body)
+    shadow_id=match.group(1) if match else "unknown"
+    sections=[]
+    for number,text in re.findall(r"^(\d+)\.\s*\n(.*?)(?=^\d+\.\s*$|\Z)",body,flags=re.M|re.S):
+        sections.append((int(number),text.strip()))
+    return shadow_id,sections
+
+def _summary(shadow_id,text):
+    keywords=sorted({w.strip(".,!?'\"").lower() for w in text.split() if w[:1].isupper() and len(w)>3})[:5]
+    return json.dumps({
+        "shadow_id":shadow_id,
+        "revealed_truth":{
+            "programming_experience":"unknown",
+            "programming_language":"unknown",
+            "skill_mastery":"unknown",
+            "leadership_claims":"unknown",
+            "team_experience":"unknown",
+            "skills and other keywords":keywords,
+        },
+        "deception_patterns":[],
+    },indent=4)
+
+def synthesize(request):
+    messages=request.get("messages") or []
+    body=messages[-1]["content"] if messages else ""
+    if body.startswith("Transcript:"):
+        shadow_id,sections=_sections(body)
+        if request.get("format"):
+            return _summary(shadow_id,body)
+        lines=[f'shadow_id:"{shadow_id}"']
+        for number,text in sections:
+            lines.append(f"{number}.")
+            lines.extend(_sentences(text))
+        return "\n".join(lines)
+    if body.startswith("Statements:"):
+        shadow_id,_=_sections(body)
+        return _summary(shadow_id,body)
+    return body
+
+def chat_response(request,content,prompt_rate=PROMPT_RATE,eval_rate=EVAL_RATE):
+    prompt_chars=sum(len(m.get("content","")) for m in request.get("messages") or [])
+    prompt_tokens=max(1,prompt_chars//4)
+    eval_tokens=max(1,len(content)//4)
+    prompt_ns=int(prompt_tokens/prompt_rate*1e9)
+    eval_ns=int(eval_tokens/eval_rate*1e9)
+    return {
+        "model":request.get("model"),
+        "created_at":CREATED_AT,
+        "message":{"role":"assistant","content":content},
+        "done":True,
+        "done_reason":"stop",
+        "total_duration":prompt_ns+eval_ns,
+        "load_duration":0,
+        "prompt_eval_count":prompt_tokens,
+        "prompt_eval_duration":prompt_ns,
+        "eval_count":eval_tokens,
+        "eval_duration":eval_ns,
+    }
+
+class MockOllama:
+    """Answers chat requests from fixtures, an upstream Ollama (recording), or synthesis"""
+    def __init__(self,fixtures=FIXTURE_DIR,upstream=None,strict=False,time_scale=0.0,
+                 prompt_rate=PROMPT_RATE,eval_rate=EVAL_RATE):
+        self.fixtures=fixtures
+        self.upstream=upstream.rstrip("/") if upstream else None
+        self.strict=strict
+        self.time_scale=time_scale
+        self.prompt_rate=prompt_rate
+        self.eval_rate=eval_rate
+        self.lock=threading.Lock()
+        self.stats={"requests":0,"replayed":0,"recorded":0,"synthesized":0}
+
+    def _fixture_path(self,key):
+        return os.path.join(self.fixtures,f"{key}.json")
+
+    def _count(self,field):
+        with self.lock:
+            self.stats["requests"]+=1
+            self.stats[field]+=1
+
+    def _record(self,key,request):
+        payload=dict(request,stream=False)
+        req=urllib.request.Request(f"{self.upstream}/api/chat",data=json.dumps(payload).encode("utf-8"),
+                                   headers={"Content-Type":"application/json"})
+        with urllib.request.urlopen(req) as resp:
+            response=json.loads(resp.read())
+        os.makedirs(self.fixtures,exist_ok=True)
+        fixture={"request":{k:request.get(k) for k in ("model","messages","format")},"response":response}
+        tmp=self._fixture_path(key)+".tmp"
+        with open(tmp,"w",encoding="utf-8") as f:
+            json.dump(fixture,f,ensure_ascii=False,indent=1)
+        os.replace(tmp,self._fixture_path(key))
+        return response
+
+    def respond(self,request):
+        """Full (non-streamed) response for a chat request; raises LookupError in strict mode without a fixture"""
+        key=fixture_key(request)
+        path=self._fixture_path(key)
+        if os.path.exists(path):
+            with open(path,"r",encoding="utf-8") as f:
+                response=json.load(f)["response"]
+            self._count("replayed")
+        elif self.upstream:
+            response=self._record(key,request)
+            self._count("recorded")
+        elif self.strict:
+            raise LookupError(f"no fixture {key[:12]} for model {request.get('model')!r}")
+        else:
+            response=chat_response(request,synthesize(request),self.prompt_rate,self.eval_rate)
+            self._count("synthesized")
+        if self.time_scale:
+            time.sleep(response.get("total_duration",0)/1e9*self.time_scale)
+        return response
+
+def stream_chunks(response):
+    # replay a finished response as Ollama's NDJSON stream: one chunk per word, stats on the last
+    content=response["message"]["content"]
+    for piece in re.findall(r"\s*\S+\s*|\s+",content):
+        yield {"model":response.get("model"),"created_at":response.get("created_at",CREATED_AT),
+               "message":{"role":"assistant","content":piece},"done":False}
+    final=dict(response,message={"role":"assistant","content":""})
+    yield final
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self,status,payload):
+            body=json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type","application/json")
+            self.send_header("Content-Length",str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path=="/api/version":
+                self._send(200,{"version":"mock"})
+            elif self.path=="/stats":
+                self._send(200,mock.stats)
+            else:
+                self._send(404,{"error":f"unknown endpoint {self.path}"})
+
+        def do_POST(self):
+            if self.path!="/api/chat":
+                self._send(404,{"error":f"unknown endpoint {self.path}"})
+                return
+            try:
+                length=int(self.headers.get("Content-Length",0))
+                request=json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                self._send(400,{"error":f"bad request: {e}"})
+                return
+            try:
+                response=mock.respond(request)
+            except LookupError as e:
+                self._send(404,{"error":str(e)})
+                return
+            except Exception as e:
+                self._send(500,{"error":f"{type(e).__name__}: {e}"})
+                return
+            # Ollama streams unless told otherwise
+            if not request.get("stream",True):
+                self._send(200,response)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type","application/x-ndjson")
+            self.send_header("Connection","close")
+            self.end_headers()
+            try:
+                for chunk in stream_chunks(response):
+                    self.wfile.write((json.dumps(chunk)+"\n").encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError,ConnectionResetError):
+                pass  # the client aborted the stream early
+            self.close_connection=True
+
+        def log_message(self,format,*args):
+            pass
+    return Handler
+
+def start(mock,host=DEFAULT_HOST,port=0):
+    # serve on a background thread; port 0 picks a free one. returns (server, base url)
+    server=ThreadingHTTPServer((host,port),make_handler(mock))
+    server.daemon_threads=True
+    threading.Thread(target=server.serve_forever,daemon=True).start()
+    return server,f"http://{host}:{server.server_address[1]}"
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Deterministic mock Ollama server (replay/record fixtures)")
+    parser.add_argument("--host",default=DEFAULT_HOST)
+    parser.add_argument("--port",type=int,default=DEFAULT_PORT)
+    parser.add_argument("--fixtures",default=FIXTURE_DIR,help="directory of recorded responses")
+    parser.add_argument("--upstream",help="real Ollama to forward misses to; its responses are saved as fixtures")
+    parser.add_argument("--strict",action="store_true",help="404 on requests without a fixture instead of synthesizing")
+    parser.add_argument("--time-scale",type=float,default=0.0,help="sleep this fraction of each response's reported duration")
+    args=parser.parse_args()
+    mock=MockOllama(args.fixtures,args.upstream,args.strict,args.time_scale)
+    server=ThreadingHTTPServer((args.host,args.port),make_handler(mock))
+    print(f"mock ollama listening on http://{args.host}:{args.port} (fixtures: {args.fixtures})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("shutting down")
+    finally:
+        server.server_close()
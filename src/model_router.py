@@ -0,0 +1,135 @@
+'''
+Length-aware model routing for the llm.py stages.
+
+Each stage has its candidate models in order of preference and a latency budget.
+For every call the router estimates the prompt size (about 4 characters per
+token) and the expected reply size, and turns both into seconds using each
+model's throughput profile. It then picks the first candidate that fits the
+context window and the budget. When none fits, it falls back to the fastest
+candidate that still fits the context window.
+
+Every decision is logged with the estimates behind it, and appended to a JSONL
+file when one is configured, so routing can be checked against real latency
+and summary quality.
+
+The built-in throughput profiles are rough placeholders. Replace them with
+measurements: ModelRouter.from_benchmark("bench_llm.json") takes tokens/sec
+from a bench_llm.py run.
+'''
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+CHARS_PER_TOKEN = 4
+
+# prompt_tps / eval_tps in tokens per second, context in tokens
+MODEL_PROFILES: Dict[str, Dict[str, float]] = {
+    "phi3": {"prompt_tps": 400.0, "eval_tps": 30.0, "context": 4096},
+    "mistral": {"prompt_tps": 200.0, "eval_tps": 15.0, "context": 32768},
+    "llama3.1": {"prompt_tps": 180.0, "eval_tps": 13.0, "context": 131072},
+}
+
+# candidates in order of preference: stage 1 is a mechanical rewrite, so the small model goes first;
+# the contradiction analysis prefers the larger ones
+STAGE_ROUTES: Dict[str, Dict[str, Any]] = {
+    "propositions": {"candidates": ["phi3", "mistral"], "budget": 30.0},
+    "summary": {"candidates": ["llama3.1", "mistral"], "budget": 60.0},
+    "fused": {"candidates": ["llama3.1", "mistral"], "budget": 90.0},
+}
+
+# expected reply size: stage 1 restates its input, the JSON summary is roughly fixed-size
+OUTPUT_RATIO = {"propositions": 0.8, "summary": 0.0, "fused": 0.0}
+OUTPUT_BASE = {"propositions": 20, "summary": 350, "fused": 350}
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class ModelRouter:
+    def __init__(self, profiles: Optional[Dict[str, Dict[str, float]]] = None,
+                 routes: Optional[Dict[str, Dict[str, Any]]] = None,
+                 log_path: Optional[str] = None, verbose: bool = True):
+        self.profiles = {k: dict(v) for k, v in (profiles or MODEL_PROFILES).items()}
+        self.routes = {k: {"candidates": list(v["candidates"]), "budget": v["budget"]}
+                       for k, v in (routes or STAGE_ROUTES).items()}
+        self.log_path = log_path
+        self.verbose = verbose
+        self.decisions: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_benchmark(cls, path: str, **kwargs) -> "ModelRouter":
+        """Router whose throughput profiles come from a bench_llm.py report"""
+        router = cls(**kwargs)
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        for result in report.get("results", []):
+            profile = router.profiles.setdefault(result["model"], {"context": 8192})
+            # stage 1 has the longer prompts, so its rates are the better estimate; don't let stage 2 override them
+            if result.get("prompt_tokens_per_second") and ("prompt_tps" not in profile or result["stage"] == "propositions"):
+                profile["prompt_tps"] = result["prompt_tokens_per_second"]
+            if result.get("tokens_per_second") and ("eval_tps" not in profile or result["stage"] == "propositions"):
+                profile["eval_tps"] = result["tokens_per_second"]
+        return router
+
+    def set_budget(self, stage: str, seconds: float):
+        self.routes[stage]["budget"] = seconds
+
+    def estimate(self, model: str, stage: str, prompt_tokens: int) -> Dict[str, Any]:
+        profile = self.profiles[model]
+        output_tokens = int(prompt_tokens * OUTPUT_RATIO[stage]) + OUTPUT_BASE[stage]
+        seconds = prompt_tokens / profile["prompt_tps"] + output_tokens / profile["eval_tps"]
+        return {
+            "model": model,
+            "output_tokens": output_tokens,
+            "seconds": round(seconds, 2),
+            "fits_context": prompt_tokens + output_tokens <= profile["context"],
+        }
+
+    def choose(self, stage: str, prompt: str, label: Optional[str] = None) -> str:
+        """Model for one call; `prompt` is the full text sent (system prefix included)"""
+        route = self.routes[stage]
+        prompt_tokens = estimate_tokens(prompt)
+        estimates = [self.estimate(m, stage, prompt_tokens) for m in route["candidates"] if m in self.profiles]
+        if not estimates:
+            raise ValueError(f"no profiled model among the {stage} candidates {route['candidates']}")
+        in_context = [e for e in estimates if e["fits_context"]] or estimates
+        within_budget = [e for e in in_context if e["seconds"] <= route["budget"]]
+        if within_budget:
+            chosen, reason = within_budget[0], "preferred model within budget"
+        else:
+            chosen, reason = min(in_context, key=lambda e: e["seconds"]), "over budget, fastest candidate"
+        decision = {
+            "time": round(time.time(), 3),
+            "stage": stage,
+            "label": label,
+            "prompt_tokens": prompt_tokens,
+            "budget": route["budget"],
+            "model": chosen["model"],
+            "estimated_seconds": chosen["seconds"],
+            "reason": reason,
+            "candidates": estimates,
+        }
+        self._log(decision)
+        return chosen["model"]
+
+    def _log(self, decision: Dict[str, Any]):
+        self.decisions.append(decision)
+        if self.verbose:
+            print(f"route {decision['stage']} ({decision['label'] or '-'}): {decision['prompt_tokens']} tokens -> "
+                  f"{decision['model']} (~{decision['estimated_seconds']}s, budget {decision['budget']}s; {decision['reason']})")
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(decision) + "\n")
+
+    def summary(self) -> Dict[str, Any]:
+        """How often each model was picked per stage, and the mean estimated latency"""
+        by_stage: Dict[str, Dict[str, Any]] = {}
+        for d in self.decisions:
+            stage = by_stage.setdefault(d["stage"], {"calls": 0, "models": {}, "estimated_seconds": 0.0})
+            stage["calls"] += 1
+            stage["models"][d["model"]] = stage["models"].get(d["model"], 0) + 1
+            stage["estimated_seconds"] += d["estimated_seconds"]
+        for stage in by_stage.values():
+            stage["mean_estimated_seconds"] = round(stage.pop("estimated_seconds") / stage["calls"], 2)
+        return by_stage
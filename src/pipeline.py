@@ -0,0 +1,262 @@
+'''
+Audio clips -> transcripts -> propositions -> JSON summaries in one process,
+with every stage running at once.
+
+    python pipeline.py clips/ --queue-size 2 --metrics pipeline_metrics.json
+
+main.py followed by llm.py hands work over through files, so Whisper (CPU, in
+this process) and Ollama (a separate server) take turns. Here each stage runs
+on its own thread and passes work downstream through a bounded queue:
+
+    decode -> transcribe -> propositions -> summary
+
+- decode: transcription cache lookup, then preprocess_audio for misses
+- transcribe: Whisper, one clip at a time; a shadow moves on once its last clip is done
+- propositions / summary: llm.py stage 1 and stage 2, one shadow at a time each
+
+Whisper on shadow N+1 overlaps stage 1 of shadow N and stage 2 of shadow N-1
+(torch and the Ollama HTTP calls both release the GIL). A full queue blocks the
+stage that feeds it, so at most --queue-size decoded clips wait in memory.
+
+At the end each stage reports its busy time, its time waiting for input
+(starved) and its time waiting for room downstream (blocked), as shares of the
+wall time. The busiest stage is the bottleneck. Outputs are the same as
+main.py batch mode plus llm.py: *_transcription.txt per clip, transcript.txt
+and transcript.jsonl next to the clips, and transcript_json.txt with one
+summary per shadow in input order.
+'''
+import os
+import time
+import queue
+import threading
+import argparse
+
+import main
+import llm
+from transcript_io import split_session_name, session_record, write_sessions, format_shadow_transcript
+from metrics import metrics, instrumented
+
+DONE=object()   # end-of-input marker, forwarded by every stage
+
+class Shadow:
+    def __init__(self,shadow_id,clips):
+        self.shadow_id=shadow_id
+        self.clips=clips
+        self.records=[]
+        self.errors=[]
+        self.propositions=None
+        self.summary=None
+
+class Clip:
+    def __init__(self,shadow,path):
+        self.shadow=shadow
+        self.path=path
+        self.audio=None
+        self.transcription=None
+        self.error=None
+
+def plan_shadows(files):
+    # consecutive clips of one shadow (collect_inputs sorts them) become one unit of LLM work
+    shadows=[]
+    for path in files:
+        shadow_id,_=split_session_name(path)
+        if not shadows or shadows[-1].shadow_id!=shadow_id:
+            shadows.append(Shadow(shadow_id,[]))
+        shadows[-1].clips.append(Clip(shadows[-1],path))
+    return shadows
+
+class Stage:
+    """One worker thread: inbox -> func(item, emit) -> outbox, with busy/starved/blocked time"""
+    def __init__(self,name,func,inbox,outbox):
+        self.name=name
+        self.func=func
+        self.inbox=inbox
+        self.outbox=outbox
+        self.items=0
+        self.failed=0
+        self.busy=0.0
+        self.starved=0.0
+        self.blocked=0.0
+        self.thread=threading.Thread(target=self._run,name=f"pipeline-{name}",daemon=True)
+
+    def emit(self,item):
+        started=time.perf_counter()
+        self.outbox.put(item)
+        self.blocked+=time.perf_counter()-started
+
+    def _run(self):
+        while True:
+            started=time.perf_counter()
+            item=self.inbox.get()
+            self.starved+=time.perf_counter()-started
+            if item is DONE:
+                self.emit(DONE)
+                return
+            started=time.perf_counter()
+            blocked=self.blocked
+            try:
+                self.func(item,self.emit)
+            except Exception as e:
+                # the stage functions record per-item errors themselves; this only keeps the thread alive
+                self.failed+=1
+                print(f"{self.name}: {type(e).__name__}: {e}")
+            elapsed=time.perf_counter()-started-(self.blocked-blocked)
+            self.busy+=elapsed
+            self.items+=1
+            metrics.add_time(f"pipeline.{self.name}",elapsed)
+
+    def report(self,wall):
+        return {"stage":self.name,"items":self.items,"failed":self.failed,
+                "busy":round(self.busy,3),"starved":round(self.starved,3),"blocked":round(self.blocked,3),
+                "utilization":round(self.busy/wall,3) if wall else 0.0}
+
+class Pipeline:
+    def __init__(self,model_name=main.MODEL_NAME,llm_model="mistral",cache=None,incremental=False,queue_size=2):
+        self.model_name=model_name
+        self.model=None
+        self.llm_model=llm_model
+        self.cache=cache
+        self.incremental=incremental
+        # the clip list goes in unbounded; decode -> transcribe carries raw audio, so its bound is what caps memory
+        queues=[queue.Queue()]+[queue.Queue(maxsize=max(1,queue_size)) for _ in range(4)]
+        self.inbox=queues[0]
+        self.outbox=queues[-1]
+        self.stages=[Stage(name,func,queues[i],queues[i+1]) for i,(name,func) in enumerate((
+            ("decode",self.decode),("transcribe",self.transcribe),
+            ("propositions",self.propositions),("summary",self.summary)))]
+
+    def decode(self,clip,emit):
+        try:
+            if self.cache is not None:
+                _,clip.transcription=main.cached_transcription(self.cache,clip.path,self.model_name)
+            if clip.transcription is None:
+                clip.audio=main.load_audio(clip.path)
+        except Exception as e:
+            clip.error=f"decode: {type(e).__name__}: {e}"
+        emit(clip)
+
+    def transcribe(self,clip,emit):
+        shadow=clip.shadow
+        try:
+            if clip.error is None:
+                if clip.transcription is None:
+                    if self.model is None:
+                        self.model=main.load_model(self.model_name)
+                    clip.transcription=main.transcribe(self.model,clip.audio)
+                    if self.cache is not None:
+                        self.cache.put(main.transcription_cache_key(clip.path,self.model_name),clip.transcription)
+                main.write_transcription(clip.path,clip.transcription)
+                shadow.records.append(session_record(clip.path,clip.transcription))
+        except Exception as e:
+            clip.error=f"transcribe: {type(e).__name__}: {e}"
+        clip.audio=None
+        if clip.error is not None:
+            print(f"{clip.path}: {clip.error}")
+            shadow.errors.append(f"{os.path.basename(clip.path)}: {clip.error}")
+        if clip is shadow.clips[-1]:
+            emit(shadow)
+
+    def propositions(self,shadow,emit):
+        if shadow.records:
+            transcript=format_shadow_transcript(shadow.shadow_id,sorted(shadow.records,key=lambda r:r["session"]))
+            try:
+                if self.incremental:
+                    shadow.propositions=llm.generate_propositions_incremental(transcript,self.llm_model)
+                else:
+                    shadow.propositions=llm.generate_propositions(transcript,self.llm_model)
+            except Exception as e:
+                shadow.errors.append(f"propositions: {type(e).__name__}: {e}")
+        emit(shadow)
+
+    def summary(self,shadow,emit):
+        if shadow.propositions is not None:
+            try:
+                shadow.summary=llm.read_propositions_to_generate_json_summary(shadow.propositions,self.llm_model)
+            except Exception as e:
+                shadow.errors.append(f"summary: {type(e).__name__}: {e}")
+        emit(shadow)
+
+    def run(self,shadows):
+        # yields finished shadows in input order; every stage is a single thread, so order is kept
+        for stage in self.stages:
+            stage.thread.start()
+        for shadow in shadows:
+            for clip in shadow.clips:
+                self.inbox.put(clip)
+        self.inbox.put(DONE)
+        while True:
+            shadow=self.outbox.get()
+            if shadow is DONE:
+                break
+            yield shadow
+        for stage in self.stages:
+            stage.thread.join()
+
+    def report(self,wall):
+        rows=[stage.report(wall) for stage in self.stages]
+        for row in rows:
+            metrics.observe(f"pipeline.{row['stage']}.utilization",row["utilization"])
+            metrics.add_time(f"pipeline.{row['stage']}.starved",row["starved"])
+            metrics.add_time(f"pipeline.{row['stage']}.blocked",row["blocked"])
+        return rows
+
+def print_report(rows,wall):
+    print(f"\nwall time {wall:.1f}s")
+    print(f"{'stage':<14}{'items':>7}{'busy s':>10}{'busy':>7}{'starved':>9}{'blocked':>9}")
+    for row in rows:
+        share=lambda seconds:f"{seconds/wall*100:.0f}%" if wall else "-"
+        print(f"{row['stage']:<14}{row['items']:>7}{row['busy']:>10.1f}{row['utilization']*100:>6.0f}%{share(row['starved']):>9}{share(row['blocked']):>9}")
+    bottleneck=max(rows,key=lambda row:row["busy"])
+    print(f"bottleneck: {bottleneck['stage']} (busy {bottleneck['utilization']*100:.0f}% of the wall time)")
+
+def run_pipeline(target,model_name=main.MODEL_NAME,llm_model="mistral",cache=None,incremental=False,queue_size=2,combined_file=None):
+    files=main.collect_inputs(target)
+    if not files:
+        print(f"No audio files found for {target}")
+        return []
+    shadows=plan_shadows(files)
+    print(f"Pipeline: {len(files)} clips from {len(shadows)} shadows")
+    pipeline=Pipeline(model_name,llm_model,cache,incremental,queue_size)
+    started=time.perf_counter()
+    finished=[]
+    for shadow in pipeline.run(shadows):
+        if shadow.errors:
+            print(f"{shadow.shadow_id}: {'; '.join(shadow.errors)}")
+        print(f"{shadow.shadow_id} done ({len(finished)+1}/{len(shadows)})")
+        finished.append(shadow)
+    wall=time.perf_counter()-started
+    if combined_file is None:
+        combined_file=os.path.join(os.path.dirname(files[0]),"transcript.txt")
+    records=[record for shadow in finished for record in sorted(shadow.records,key=lambda r:r["session"])]
+    by_source={record["source"]:record for record in records}
+    main.write_combined_transcript([(path,by_source[os.path.basename(path)]["text"]) for path in files
+                                    if os.path.basename(path) in by_source],combined_file)
+    base=os.path.splitext(combined_file)[0]
+    write_sessions(base+".jsonl",records)
+    summaries=[shadow.summary for shadow in finished if shadow.summary is not None]
+    with open(base+"_json.txt","w",encoding="utf-8") as f:
+        f.write("\n".join(summaries))
+    print(f"Combined transcript saved to {combined_file}, session records to {base}.jsonl, {len(summaries)} json summaries to {base}_json.txt")
+    metrics.count("pipeline.shadows",len(finished))
+    metrics.count("pipeline.failed_shadows",sum(1 for shadow in finished if shadow.summary is None))
+    print_report(pipeline.report(wall),wall)
+    return finished
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Audio clips -> transcripts -> propositions -> JSON summaries, all stages overlapped")
+    parser.add_argument("input",help="a directory of session clips or a quoted glob such as 'clips/*.mp3'")
+    parser.add_argument("--queue-size",type=int,default=2,help="items each stage may queue for the next one")
+    parser.add_argument("--whisper-model",default=main.MODEL_NAME)
+    parser.add_argument("--model",default="mistral",help="Ollama model for both LLM stages")
+    parser.add_argument("--incremental",action="store_true",help="run stage 1 per session paragraph (see llm.py --incremental)")
+    parser.add_argument("--combined",help="combined transcript path (default: transcript.txt next to the clips)")
+    parser.add_argument("--no-cache",action="store_true",help="ignore the transcription and LLM response caches")
+    parser.add_argument("--metrics",help="write stage timers, utilization and LLM counters as JSON to this path")
+    parser.add_argument("--profile",help="run under cProfile and save the stats to this path")
+    args=parser.parse_args()
+    cache=None if args.no_cache else main.open_transcription_cache()
+    # create the LLM response cache up front: both LLM stage threads use it
+    llm.configure_cache(not args.no_cache and llm._cache_enabled)
+    with instrumented(args.metrics,args.profile):
+        run_pipeline(args.input,args.whisper_model,args.model,cache,args.incremental,args.queue_size,args.combined)
+        print(f"llm calls: {llm.call_stats['llm_calls']}, cache hits: {llm.call_stats['cache_hits']}")
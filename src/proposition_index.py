@@ -0,0 +1,262 @@
+'''
+Near-duplicate and same-topic candidate pairs over a shadow's propositions.
+
+Comparing every proposition with every other one is quadratic in interview
+length. PropositionIndex keeps a MinHash signature of each distinct
+proposition instead and buckets the signatures by band (locality-sensitive
+hashing). Only propositions that share a bucket become candidate pairs, so
+the cost grows with the number of propositions plus the number of similar
+pairs.
+
+Propositions are compared on their content words: stop words, filler and
+negations are dropped, plurals are folded and every figure, in digits or words,
+is masked. "For seven years I was the front end department." and "I've only
+been there two years." land together as the same topic, and the caller decides
+whether they make the same claim and the differing figures are a contradiction
+(TruthWeaver.score_claim_pair uses claim_tokens(), figures() and is_negated()).
+Exact duplicates are merged into one entry that remembers every session it came
+from.
+
+Similarity is the overlap coefficient, |A & B| / min(|A|, |B|): a contradiction
+is usually a short denial of a longer claim ("I am not a devops engineer." vs
+"I am a DevOps engineer specializing in Kubernetes."). MinHash estimates
+Jaccard, which scores such a pair low (2/4 here), so the bands are tuned per
+pair of sizes, as in LSH Ensemble: entries are bucketed by their number of
+topic tokens, and a proposition with s tokens is only compared with entries of
+L >= s tokens. An overlap of t between them means a Jaccard of at least t*s /
+(s + L - t*s). The query uses the band layout with the most rows that still
+buckets a pair at that floor together with probability `recall` (0.7). At the
+default threshold of 0.6 that is 21 bands of 3 rows for propositions of the
+same length and 32 bands of 2 rows as the lengths drift apart. 16 bands of 4
+rows take over at higher thresholds, and one-row bands are only used for a one-
+to three-word proposition against one several times longer. More rows means
+fewer chance collisions, so the candidates stay close to the similar pairs.
+Each query collects its candidates in a set, and a bucket holds at most
+max_bucket entries, so no common topic fans out into every pair. The exact
+overlap is then computed for the candidates only.
+
+Inputs are (session, proposition) pairs, e.g. from
+textToPropSentences.map_to_propositions per session.
+'''
+import re
+import zlib
+import random
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple
+
+MERSENNE_PRIME = (1 << 61) - 1
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#']+")
+NUMBER_PATTERN = re.compile(r"^\d+$")
+NUMBER_WORDS = {word: value for value, word in enumerate(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+    "sixteen seventeen eighteen nineteen twenty".split())}
+NUMBER_WORDS.update({'thirty': 30, 'forty': 40, 'fifty': 50, 'hundred': 100, 'dozen': 12})
+NEGATIONS = frozenset("not never no nothing nobody don't doesn't didn't isn't wasn't aren't weren't "
+                      "can't cannot couldn't won't wouldn't haven't hasn't hadn't".split())
+# function words, contractions and interview filler. "one" is here because it is mostly a pronoun
+# ("I want to be one"); figures() still reads it when a unit follows ("one year")
+STOP_WORDS = frozenset("i a an the of to in on for and or with my me is am are was were be been being have has "
+                       "had this that it as at by from i'm i've i'd i'll it's that's there's we we're you you're "
+                       "your our us they he she his her him them their its so but also just only really very "
+                       "then there here about over more most some any all what why how when who which would "
+                       "could should will can do did does wanna gonna want ok okay like mostly usually "
+                       "actually basically one".split())
+# who a claim is about: stop words for topics, but part of the claim (claim_tokens)
+SUBJECTS = {"i": "i", "i'm": "i", "i've": "i", "i'd": "i", "i'll": "i", "me": "i", "my": "i",
+            "we": "we", "we're": "we", "us": "we", "our": "we", "you": "you", "you're": "you", "your": "you",
+            "he": "he", "him": "he", "his": "he", "she": "she", "her": "she",
+            "they": "they", "them": "they", "their": "they"}
+
+
+def _fold(token: str) -> str:
+    # years -> year, engineers -> engineer; short words and -ss words are left alone
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def _figure(token: str):
+    if NUMBER_PATTERN.match(token):
+        return int(token)
+    return NUMBER_WORDS.get(token)
+
+
+def topic_tokens(text: str) -> Set[str]:
+    """Content words of a proposition, figures masked as '#'"""
+    tokens = set()
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOP_WORDS or token in NEGATIONS:
+            continue
+        tokens.add('#' if _figure(token) is not None else _fold(token))
+    return tokens
+
+
+def claim_tokens(text: str) -> Set[str]:
+    """What a proposition says, minus figures and negations: its content words and its subject.
+
+    "I have 3 years of experience with Python" -> {i, year, experience, python}
+    """
+    tokens = set()
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        subject = SUBJECTS.get(token)
+        if subject is not None:
+            tokens.add(subject)
+        elif token not in STOP_WORDS and token not in NEGATIONS and _figure(token) is None:
+            tokens.add(_fold(token))
+    return tokens
+
+
+def figures(text: str) -> Dict[str, Set[int]]:
+    """unit -> figures stated for it: "I managed 6 engineers for two years" -> {engineer: {6}, year: {2}}"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    found: Dict[str, Set[int]] = defaultdict(set)
+    for i, token in enumerate(tokens):
+        value = _figure(token)
+        if value is None:
+            continue
+        # the unit is the word right after the figure; a figure with none ("be one", "3:00") is not a claim
+        if i + 1 < len(tokens) and tokens[i + 1] not in STOP_WORDS and _figure(tokens[i + 1]) is None:
+            found[_fold(tokens[i + 1])].add(value)
+    return found
+
+
+def is_negated(text: str) -> bool:
+    return any(token in NEGATIONS for token in TOKEN_PATTERN.findall(text.lower()))
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.lower().split()).rstrip('.!?')
+
+
+def overlap(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+class CandidatePair(NamedTuple):
+    first: str
+    second: str
+    first_sessions: Tuple[int, ...]
+    second_sessions: Tuple[int, ...]
+    similarity: float       # exact overlap coefficient of the topic tokens
+
+
+# (bands, rows) over the first bands*rows min-hashes, most selective first
+BAND_LAYOUTS = ((16, 4), (21, 3), (32, 2), (64, 1))
+
+
+def jaccard_floor(overlap_threshold: float, small: int, large: int) -> float:
+    """Lowest Jaccard of an s-token and an L-token set whose overlap coefficient is overlap_threshold"""
+    shared = overlap_threshold * small
+    return shared / (small + large - shared)
+
+
+class PropositionIndex:
+    def __init__(self, num_perm: int = 64, max_bucket: int = 64, recall: float = 0.7, seed: int = 1):
+        self.layouts = [(bands, rows) for bands, rows in BAND_LAYOUTS if bands * rows <= num_perm]
+        if not self.layouts:
+            raise ValueError(f"num_perm ({num_perm}) is too small for any band layout")
+        self.max_bucket = max_bucket
+        self.recall = recall
+        rng = random.Random(seed)
+        # h(x) = (a*x + b) mod p; crc32 keeps token hashes stable across runs (unlike hash())
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+        self.texts: List[str] = []
+        self.tokens: List[Set[str]] = []
+        self.sessions: List[List[int]] = []
+        self._ids: Dict[str, int] = {}
+        self._signatures: Dict[int, List[int]] = {}
+        # (topic size, rows, band, min-hashes) -> entries, at most max_bucket of them
+        self._buckets: Dict[Tuple[int, int, int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        self._sizes: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def signature(self, tokens: Set[str]) -> List[int]:
+        hashes = [zlib.crc32(token.encode('utf-8')) for token in tokens]
+        return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    @staticmethod
+    def _bands(signature: List[int], bands: int, rows: int) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(bands):
+            yield band, tuple(signature[band * rows:(band + 1) * rows])
+
+    def add(self, text: str, session: int) -> int:
+        """Index one proposition; returns its entry id (shared by exact duplicates)"""
+        key = normalize(text)
+        entry = self._ids.get(key)
+        if entry is not None:
+            if session not in self.sessions[entry]:
+                self.sessions[entry].append(session)
+            return entry
+        entry = self._ids[key] = len(self.texts)
+        tokens = topic_tokens(text)
+        self.texts.append(text.strip())
+        self.tokens.append(tokens)
+        self.sessions.append([session])
+        if not tokens:
+            # nothing but stop words: no topic to compare on
+            return entry
+        size = len(tokens)
+        signature = self._signatures[entry] = self.signature(tokens)
+        self._sizes.add(size)
+        for bands, rows in self.layouts:
+            for band, hashes in self._bands(signature, bands, rows):
+                bucket = self._buckets[(size, rows, band, hashes)]
+                if len(bucket) < self.max_bucket:
+                    bucket.append(entry)
+        return entry
+
+    def add_all(self, propositions: Iterable[Tuple[int, str]]) -> "PropositionIndex":
+        for session, text in propositions:
+            self.add(text, session)
+        return self
+
+    def layout_for(self, threshold: float, small: int, large: int) -> Tuple[int, int]:
+        """Band layout for overlap >= threshold between an s-token and an L-token proposition"""
+        floor = jaccard_floor(threshold, small, large)
+        for bands, rows in self.layouts:
+            # chance that some band of rows min-hashes agrees for a pair right at the floor
+            if 1 - (1 - floor ** rows) ** bands >= self.recall:
+                return bands, rows
+        return self.layouts[-1]
+
+    def candidates(self, entry: int, threshold: float = 0.6) -> Set[int]:
+        """Entries of at least this entry's size that share a bucket with it (each pair is found once)"""
+        size = len(self.tokens[entry])
+        signature = self._signatures.get(entry)
+        found: Set[int] = set()
+        if signature is None:
+            return found
+        for large in self._sizes:
+            if large < size:
+                continue
+            bands, rows = self.layout_for(threshold, size, large)
+            for band, hashes in self._bands(signature, bands, rows):
+                found.update(self._buckets.get((large, rows, band, hashes), ()))
+        # a same-size pair is found from both sides; keep it on the lower id only
+        return {other for other in found if other != entry and (len(self.tokens[other]) > size or other > entry)}
+
+    def candidate_ids(self, threshold: float = 0.6) -> Iterator[Tuple[int, int]]:
+        """Entry pairs that share an LSH bucket under the band layout for their sizes"""
+        for entry in range(len(self.texts)):
+            for other in self.candidates(entry, threshold):
+                yield (entry, other) if entry < other else (other, entry)
+
+    def pairs(self, threshold: float = 0.6, cross_session: bool = True) -> List[CandidatePair]:
+        """Candidate pairs at or above the topic similarity threshold, most similar first.
+
+        cross_session keeps only pairs that were said in different sessions.
+        """
+        found = []
+        for i, j in self.candidate_ids(threshold):
+            if cross_session and not any(a != b for a in self.sessions[i] for b in self.sessions[j]):
+                continue
+            similarity = overlap(self.tokens[i], self.tokens[j])
+            if similarity >= threshold:
+                found.append(CandidatePair(self.texts[i], self.texts[j], tuple(sorted(self.sessions[i])),
+                                           tuple(sorted(self.sessions[j])), round(similarity, 3)))
+        found.sort(key=lambda p: (-p.similarity, p.first_sessions, p.second_sessions, p.first, p.second))
+        return found
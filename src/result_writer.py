@@ -0,0 +1,148 @@
+'''
+Streaming output for TruthWeaver results.
+
+ResultWriter encodes each shadow's analysis once (indented JSON, as the
+output files always had it) when it completes and passes the text to every
+sink:
+- SeparatedTextSink: output.txt, each result followed by a '=====' line
+- JSONArraySink: truth_analysis.json, laid out exactly as json.dump(results,
+  indent=2) would write it, but built up one element at a time. The closing
+  bracket is written at every flush and overwritten by the next element, so
+  the file parses as a complete array whenever it has just been flushed.
+- JSONLSink: one compact line per result, easy to tail or resume from
+
+Only the current result is held in memory, and files are flushed every
+flush_every results, so partial output is usable while a batch is running.
+A sink is any object with write(result, text) and close().
+'''
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+SEPARATOR = '=' * 50
+# json.dumps escapes newlines inside strings, so every newline in the indented text is layout
+_LAYOUT = re.compile(r'\n\s*')
+
+
+def encode_result(result: Dict[str, Any]) -> str:
+    return json.dumps(result, indent=2, ensure_ascii=False)
+
+
+def compact(text: str) -> str:
+    """encode_result() output as one line, without encoding again"""
+    return _LAYOUT.sub('', text)
+
+
+class SeparatedTextSink:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, result: Dict[str, Any], text: str):
+        self.file.write(text)
+        self.file.write('\n' + SEPARATOR + '\n')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class JSONArraySink:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(b'[')
+        self._end = 1           # bytes of elements written so far; the closing bracket goes here
+        self._empty = True
+
+    def write(self, result: Dict[str, Any], text: str):
+        # same layout as json.dump(list, indent=2): elements indented one level, ",\n" between them
+        data = ('\n  ' if self._empty else ',\n  ') + text.replace('\n', '\n  ')
+        data = data.encode('utf-8')
+        self.file.write(data)
+        self._end += len(data)
+        self._empty = False
+
+    def _close_array(self):
+        self.file.write(b']' if self._empty else b'\n]')
+
+    def flush(self):
+        # write the closing bracket so the file parses right now, then step back over it;
+        # the next element overwrites it
+        self._close_array()
+        self.file.flush()
+        self.file.seek(self._end)
+
+    def close(self):
+        self._close_array()
+        self.file.close()
+
+
+class JSONLSink:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, result: Dict[str, Any], text: str):
+        # strip the indentation instead of encoding a second time
+        self.file.write(compact(text))
+        self.file.write('\n')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ResultWriter:
+    def __init__(self, sinks: Iterable[Any], flush_every: int = 1):
+        self.sinks: List[Any] = list(sinks)
+        self.flush_every = max(1, flush_every)
+        self.count = 0
+
+    @classmethod
+    def to_files(cls, output_filename: Optional[str] = 'output.txt',
+                 json_filename: Optional[str] = 'truth_analysis.json',
+                 jsonl_filename: Optional[str] = None, flush_every: int = 1,
+                 sinks: Iterable[Any] = ()) -> "ResultWriter":
+        """Writer for the usual output files (pass None to skip one), plus any extra sinks"""
+        files = []
+        if output_filename:
+            files.append(SeparatedTextSink(output_filename))
+        if json_filename:
+            files.append(JSONArraySink(json_filename))
+        if jsonl_filename:
+            files.append(JSONLSink(jsonl_filename))
+        return cls(files + list(sinks), flush_every)
+
+    def write(self, result: Dict[str, Any]):
+        text = encode_result(result)
+        for sink in self.sinks:
+            sink.write(result, text)
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.flush()
+
+    def write_all(self, results: Iterable[Dict[str, Any]]) -> int:
+        for result in results:
+            self.write(result)
+        return self.count
+
+    def flush(self):
+        for sink in self.sinks:
+            flush = getattr(sink, 'flush', None)
+            if flush is not None:
+                flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
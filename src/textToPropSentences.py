@@ -1,5 +1,7 @@
 import re
-import sys
+import argparse
+
+from metrics import metrics, instrumented
 
 # ---------- Filler / disfluency removal ----------
 FILLERS = [
@@ -11,12 +13,34 @@ FILLERS = [
     r"\bin reality\b", r"\bseriously\b", r"\bthey know\b"
 ]
 
+def _filler_passes(fillers):
+    # Fillers are removed in list order, one after another. Consecutive \b...\b fillers can share one
+    # alternation: removing one of them leaves non-word characters on both sides, so it can't create
+    # a match for a later one (as long as no filler's trailing words are another's leading words).
+    # A filler that also eats what follows it (`ha` takes the trailing whitespace, which can join
+    # two words into a later filler) is an ordering barrier and gets a pass of its own.
+    passes, group = [], []
+    for f in fillers:
+        if f.startswith(r"\b") and f.endswith(r"\b"):
+            group.append(f)
+            continue
+        if group:
+            passes.append(group)
+            group = []
+        passes.append([f])
+    if group:
+        passes.append(group)
+    return [re.compile("|".join(f"(?:{f})" for f in group), re.I) for group in passes]
+
+FILLER_PASSES = _filler_passes(FILLERS)
+WHITESPACE = re.compile(r"\s+")
+
 def clean_text(text: str) -> str:
     text = text.lower()
-    for f in FILLERS:
-        text = re.sub(f, "", text, flags=re.I)
+    for filler_pass in FILLER_PASSES:
+        text = filler_pass.sub("", text)
     # normalize whitespace
-    text = re.sub(r"\s+", " ", text).strip()
+    text = WHITESPACE.sub(" ", text).strip()
     return text
 
 # ---------- Mapping templates ----------
@@ -59,32 +83,53 @@ TEMPLATES = [
     (r"fraud|impostor", lambda m: "I admitted to being a fraud."),
 ]
 
+TEMPLATE_PATTERNS = [re.compile(pat) for pat, _ in TEMPLATES]
+# all templates as one alternation: a single scan settles the common case, a sentence no template
+# matches. It can't say which template comes first in list order (it finds the leftmost match), so
+# sentences that do match go through the ordered loop. Named groups per template would say which
+# alternative matched, but make sre's scan about twice as slow.
+ANY_TEMPLATE = re.compile("|".join(f"(?:{pat})" for pat, _ in TEMPLATES))
+SENTENCE_END = re.compile(r"[.?!]")
+
+def first_template(sentence: str):
+    """(index, match) of the first template in list order that matches anywhere, or (None, None)"""
+    if ANY_TEMPLATE.search(sentence) is None:
+        return None, None
+    for index, pattern in enumerate(TEMPLATE_PATTERNS):
+        m = pattern.search(sentence)
+        if m:
+            return index, m
+    return None, None
+
 def map_to_propositions(text: str):
     # split into rough sentences
-    sentences = re.split(r"[.?!]", text)
+    sentences = SENTENCE_END.split(text)
     results = []
     for s in sentences:
         s = s.strip()
         if not s: 
             continue
         mapped = None
-        for pat, func in TEMPLATES:
-            m = re.search(pat, s)
-            if m:
-                mapped = func(m)
-                results.append(mapped)
-                break
+        index, m = first_template(s)
+        if m:
+            mapped = TEMPLATES[index][1](m)
+            results.append(mapped)
         if not mapped:
             results.append(s)  # fallback
+            metrics.count("props.unmapped_sentences")
+    metrics.count("props.sentences", len(results))
     return results
 
 # ---------- Pipeline ----------
 def transcript_to_props(input_file: str, output_file: str):
     with open(input_file, "r", encoding="utf-8") as f:
         raw_text = f.read()
+    metrics.count("props.input_chars", len(raw_text))
 
-    cleaned = clean_text(raw_text)
-    props = map_to_propositions(cleaned)
+    with metrics.timer("props.clean_text"):
+        cleaned = clean_text(raw_text)
+    with metrics.timer("props.map_to_propositions"):
+        props = map_to_propositions(cleaned)
 
     with open(output_file, "w", encoding="utf-8") as f:
         for p in props:
@@ -94,7 +139,11 @@ def transcript_to_props(input_file: str, output_file: str):
 
 # ---------- Run as script ----------
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python transcript_to_props.py input.txt output.txt")
-        sys.exit(1)
-    transcript_to_props(sys.argv[1], sys.argv[2])
+    parser = argparse.ArgumentParser(description="Rule-based transcript -> proposition sentences")
+    parser.add_argument("input_file")
+    parser.add_argument("output_file")
+    parser.add_argument("--metrics", help="write stage timers and counters as JSON to this path")
+    parser.add_argument("--profile", help="run under cProfile and save the stats to this path")
+    args = parser.parse_args()
+    with instrumented(args.metrics, args.profile):
+        transcript_to_props(args.input_file, args.output_file)
@@ -0,0 +1,101 @@
+'''
+Structured transcript records: one JSON line per session.
+
+    {"shadow_id": "atlas_2025", "session": 3, "source": "atlas_2025_3.mp3",
+     "text": "...", "segments": [...], "words": [...]}
+
+main.py writes them (--jsonl). truth_weaver.py and llm.py read them through
+iter_sessions/iter_shadows, so session boundaries come straight from the file
+instead of being recovered from free text.
+'''
+import os
+import re
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+SEGMENT_FIELDS = ("id", "start", "end", "text", "avg_logprob", "no_speech_prob")
+WORD_FIELDS = ("word", "start", "end", "probability")
+SHADOW_HEADER = re.compile(r'shadow_id:\s*"([^"]*)"')
+SESSION_HEADER = re.compile(r"^\s*(\d+)\.\s*$", re.M)
+
+
+def split_session_name(input_file: str) -> Tuple[str, int]:
+    """"atlas_2025_3.mp3" -> ("atlas_2025", 3); files without a session suffix are session 1"""
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    match = re.match(r"^(.*)_(\d+)$", stem)
+    if match:
+        return match.group(1), int(match.group(2))
+    return stem, 1
+
+
+def session_record(input_file: str, transcription: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the JSONL record for one transcribed session clip"""
+    shadow_id, session = split_session_name(input_file)
+    segments, words = [], []
+    for seg in transcription.get("segments", []):
+        segments.append({k: seg[k] for k in SEGMENT_FIELDS if k in seg})
+        words.extend({k: w[k] for k in WORD_FIELDS if k in w} for w in seg.get("words", []))
+    return {
+        "shadow_id": shadow_id,
+        "session": session,
+        "source": os.path.basename(input_file),
+        "text": transcription["text"].strip(),
+        "segments": segments,
+        "words": words,
+    }
+
+
+def write_sessions(path: str, records: Iterable[Dict[str, Any]]):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def iter_sessions(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream session records from a JSONL file, one line at a time"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid session record: {e}") from e
+
+
+def iter_shadows(path: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Group consecutive records by shadow_id, each group ordered by session number"""
+    current_id, current = None, []
+    for record in iter_sessions(path):
+        if record["shadow_id"] != current_id and current:
+            yield current_id, sorted(current, key=lambda r: r["session"])
+            current = []
+        current_id = record["shadow_id"]
+        current.append(record)
+    if current:
+        yield current_id, sorted(current, key=lambda r: r["session"])
+
+
+def format_shadow_transcript(shadow_id: str, records: List[Dict[str, Any]]) -> str:
+    """Render a shadow's sessions in the numbered layout the llm.py prompts expect"""
+    lines = [f'shadow_id:"{shadow_id}"']
+    for record in records:
+        lines.append(f"{record['session']}.")
+        lines.append(record["text"])
+    return "\n".join(lines)
+
+
+def parse_shadow_transcript(text: str) -> Tuple[Optional[str], List[Tuple[int, str]]]:
+    """Inverse of format_shadow_transcript; text without numbered sessions is all session 1"""
+    match = SHADOW_HEADER.search(text)
+    shadow_id = match.group(1) if match else None
+    body = text[match.end():] if match else text
+    headers = list(SESSION_HEADER.finditer(body))
+    if not headers:
+        return shadow_id, [(1, body.strip())]
+    sessions = []
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(body)
+        sessions.append((int(header.group(1)), body[header.end():end].strip()))
+    return shadow_id, sessions
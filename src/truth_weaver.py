@@ -1,18 +1,40 @@
-import json
+import io
+import os
 import re
 import logging
-from typing import Dict, List, Any, Tuple
-from collections import defaultdict, Counter
-import difflib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+from collections import defaultdict, deque, Counter
+
+from transcript_io import iter_shadows
+from keyword_matcher import KeywordTable, KeywordIndex
+from claim_table import ClaimTable, DURATION, extract_claims
+from metrics import metrics, instrumented
+from result_writer import ResultWriter
+from claim_index import ClaimIndexWriter
+from proposition_index import PropositionIndex, CandidatePair, claim_tokens, figures, is_negated, overlap
+from textToPropSentences import clean_text, map_to_propositions
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHUNK_SIZE = 32
+
 class TruthWeaver:
-    def __init__(self):
+    def __init__(self, quiet: bool = False, claim_contradictions: bool = False):
         """Initialize the Truth Weaver system"""
         logger.info("🔮 Initializing Truth Weaver - Whispering Shadows Analyzer")
+        # quiet skips the per-hit and per-marker logs (and formatting their messages) in the hot loops
+        self.log_hits = not quiet
+        # opt-in: pair up same-topic propositions across sessions and report the conflicting ones
+        self.claim_contradictions = claim_contradictions
+        # overlap coefficient of the topic tokens; tuned on transcript.txt (see check_contradictions.py)
+        self.topic_threshold = 0.6
+        # a conflicting pair must make the same claim: the shorter one's words, subject and skill included,
+        # all appear in the longer one once figures and negations are set aside
+        self.claim_threshold = 1.0
         
         # Technical skills patterns
         self.programming_languages = {
@@ -43,6 +65,65 @@ class TruthWeaver:
             'individual': ['alone', 'solo', 'individual', 'myself', 'on my own']
         }
         
+        # Common technical keywords
+        self.tech_keywords = [
+            ' machine learning ', ' ml ', ' ai ', 'artificial intelligence',
+            'data science', 'analytics', 'big data',
+            'web development', 'frontend', 'backend', 'full stack',
+            'database', 'sql', 'nosql', 'mongodb', 'postgresql',
+            'cloud', ' aws ', 'azure', 'gcp', 'docker', 'kubernetes',
+            ' api ', ' rest ', 'graphql', 'microservices',
+            'testing', 'unit testing', 'integration testing',
+            'agile', 'scrum', 'devops', 'ci/cd'
+        ]
+        
+        # Confidence markers, checked per session in this order
+        self.confidence_patterns = {
+            'confident': ['confident', 'sure', 'definitely', 'absolutely'],
+            'uncertain': ['maybe', 'perhaps', 'not sure', 'uncertain'],
+            'emotional_breakdown': ['sobbing', 'crying', 'breakdown', 'emotional']
+        }
+        
+        # Every keyword list compiled into one automaton, so a shadow is scanned once for all of them
+        entries = [(f'language:{lang}', keyword) for lang, keywords in self.programming_languages.items() for keyword in keywords]
+        for level in ('beginner', 'intermediate', 'advanced'):
+            entries += [(level, keyword) for keyword in self.experience_patterns[level]]
+        for group in ('leadership_roles', 'individual'):
+            entries += [(group, keyword) for keyword in self.leadership_patterns[group]]
+        entries += [('tech', keyword) for keyword in self.tech_keywords]
+        for level, words in self.confidence_patterns.items():
+            entries += [(f'confidence:{level}', word) for word in words]
+        self.keyword_table = KeywordTable(entries)
+        
+        # Claim regexes compiled once; the string patterns above stay the source of truth
+        self.duration_patterns = {
+            'years': re.compile(self.experience_patterns['years']),
+            'months': re.compile(self.experience_patterns['months'])
+        }
+        self.team_size_pattern = re.compile(self.leadership_patterns['team_size'])
+        
+    # Transcript markers, checked on every stripped line
+    subject_pattern = re.compile(r'(?:subject|shadow|agent)[:\s]*([a-zA-Z0-9_]+)', re.IGNORECASE)
+    session_pattern = re.compile(r'session[:\s]*(\d+)', re.IGNORECASE)
+    
+    def scan_keywords(self, sessions: List[str]) -> KeywordIndex:
+        """One pass over a shadow's sessions for every keyword table"""
+        with metrics.timer('truth_weaver.scan_keywords'):
+            hits = self.keyword_table.scan(sessions)
+        metrics.count('truth_weaver.keyword_hits', len(hits.hits))
+        return hits
+    
+    def extract_claims(self, sessions: List[str], hits: Optional[KeywordIndex] = None) -> ClaimTable:
+        """Typed claims (durations, team sizes, roles, confidence markers) for one shadow"""
+        if hits is None:
+            hits = self.scan_keywords(sessions)
+        confidence_categories = [(f'confidence:{level}', level) for level in self.confidence_patterns]
+        with metrics.timer('truth_weaver.extract_claims'):
+            claims = extract_claims(hits, self.duration_patterns, self.team_size_pattern,
+                                    ('leadership_roles', 'individual'), confidence_categories)
+        metrics.count('truth_weaver.claims', len(claims))
+        return claims
+        
     def read_input_file(self, filename: str = 'input.txt') -> str:
         """Read the converted audio transcript"""
         logger.info(f"📖 Reading input file: {filename}")
@@ -64,93 +145,110 @@ class TruthWeaver:
         
         sessions_data = defaultdict(list)
         
-        # Try to identify session patterns
-        session_patterns = [
-            r'Session\s+(\d+)[:\s]*(.+?)(?=Session\s+\d+|$)',
-            r'subject[:\s]*(\w+).*?session[:\s]*(\d+)[:\s]*(.+?)(?=session|subject|$)',
-            r'(\w+).*?session[:\s]*(\d+)[:\s]*(.+?)(?=session|subject|$)'
-        ]
+        # A shadow that reappears later in the content is merged back into its first entry
+        for subject, sessions in self.iter_parsed_sessions(io.StringIO(content)):
+            sessions_data[subject].extend(sessions)
+        
+        logger.info(f"✅ Parsed {len(sessions_data)} subjects with sessions")
+        for subject, sessions in sessions_data.items():
+            logger.info(f"  - {subject}: {len(sessions)} sessions")
         
-        # Split content by likely session boundaries
-        lines = content.split('\n')
+        return dict(sessions_data)
+    
+    def stream_sessions(self, filename: str) -> Iterator[Tuple[str, List[str]]]:
+        """Stream (shadow_id, sessions) from a transcript file without reading it whole"""
+        logger.info(f"📖 Streaming input file: {filename}")
+        try:
+            with open(filename, 'r', encoding='utf-8') as file:
+                yield from self.iter_parsed_sessions(file)
+        except FileNotFoundError:
+            logger.error(f"❌ Input file {filename} not found")
+            raise
+    
+    def iter_parsed_sessions(self, lines: Iterable[str]) -> Iterator[Tuple[str, List[str]]]:
+        """Yield each shadow's sessions as soon as a different subject's content starts.
+        
+        Only the current shadow is held in memory. Consecutive markers for the same subject
+        continue its block; a subject that comes back after another one is yielded again.
+        """
         current_subject = "unknown_shadow"
-        current_session = 1
         current_content = []
-        
-        for line in lines:
-            line = line.strip()
+        block_subject, block_sessions = None, []
+        # raw text is only kept while no content line has been seen, for the no-sessions fallback
+        raw_prefix = []
+        
+        for raw_line in lines:
+            if raw_prefix is not None:
+                raw_prefix.append(raw_line)
+            line = raw_line.strip()
             if not line:
                 continue
                 
             # Check for subject/shadow identifiers
-            subject_match = re.search(r'(?:subject|shadow|agent)[:\s]*([a-zA-Z0-9_]+)', line, re.IGNORECASE)
+            subject_match = self.subject_pattern.search(line)
             if subject_match:
                 # Save previous session if exists
                 if current_content:
-                    sessions_data[current_subject].append(' '.join(current_content))
+                    block_sessions.append(' '.join(current_content))
                     current_content = []
                 current_subject = subject_match.group(1).lower()
-                logger.info(f"👤 Identified subject: {current_subject}")
+                if self.log_hits:
+                    logger.info(f"👤 Identified subject: {current_subject}")
                 continue
             
             # Check for session identifiers
-            session_match = re.search(r'session[:\s]*(\d+)', line, re.IGNORECASE)
+            session_match = self.session_pattern.search(line)
             if session_match:
                 # Save previous session if exists
                 if current_content:
-                    sessions_data[current_subject].append(' '.join(current_content))
+                    block_sessions.append(' '.join(current_content))
                     current_content = []
-                current_session = int(session_match.group(1))
-                logger.info(f"📝 Processing Session {current_session} for {current_subject}")
+                if self.log_hits:
+                    logger.info(f"📝 Processing Session {int(session_match.group(1))} for {current_subject}")
                 continue
             
+            # First content line of another subject closes the current block
+            if not current_content and current_subject != block_subject:
+                if block_sessions:
+                    logger.info(f"  - {block_subject}: {len(block_sessions)} sessions")
+                    yield block_subject, block_sessions
+                block_subject, block_sessions = current_subject, []
+            
             # Add line to current session content
             current_content.append(line)
+            raw_prefix = None
         
         # Don't forget the last session
         if current_content:
-            sessions_data[current_subject].append(' '.join(current_content))
+            block_sessions.append(' '.join(current_content))
+        if block_sessions:
+            logger.info(f"  - {block_subject}: {len(block_sessions)} sessions")
+            yield block_subject, block_sessions
         
         # If no clear session structure, treat as single subject with multiple sessions
-        if not sessions_data and content.strip():
-            # Split content roughly into 5 parts (assuming 5 sessions)
-            content_parts = content.split('\n\n') if '\n\n' in content else [content]
-            for i, part in enumerate(content_parts[:5]):
-                if part.strip():
-                    sessions_data["shadow_agent"].append(part.strip())
-        
-        logger.info(f"✅ Parsed {len(sessions_data)} subjects with sessions")
-        for subject, sessions in sessions_data.items():
-            logger.info(f"  - {subject}: {len(sessions)} sessions")
-        
-        return dict(sessions_data)
+        elif raw_prefix:
+            content = ''.join(raw_prefix)
+            if content.strip():
+                # Split content roughly into 5 parts (assuming 5 sessions)
+                content_parts = content.split('\n\n') if '\n\n' in content else [content]
+                sessions = [part.strip() for part in content_parts[:5] if part.strip()]
+                if sessions:
+                    yield "shadow_agent", sessions
     
-    def extract_programming_experience(self, sessions: List[str]) -> Tuple[str, str]:
+    def extract_programming_experience(self, sessions: List[str], claims: Optional[ClaimTable] = None) -> Tuple[str, str]:
         """Extract programming experience and language from sessions"""
         logger.info("⚡ Extracting programming experience and language")
         
-        all_text = ' '.join(sessions).lower()
-        
-        # Extract years/months of experience
-        years_matches = re.findall(self.experience_patterns['years'], all_text)
-        months_matches = re.findall(self.experience_patterns['months'], all_text)
+        if claims is None:
+            claims = self.extract_claims(sessions)
+        hits = claims.keywords
         
+        # Years/months of experience, already converted to months in the claim table
         experience_claims = []
-        if years_matches:
-            for year in years_matches:
-                try:
-                    experience_claims.append(int(year) * 12)  # Convert to months
-                    logger.info(f"  📊 Found experience claim: {year} years")
-                except ValueError:
-                    continue
-        
-        if months_matches:
-            for month in months_matches:
-                try:
-                    experience_claims.append(int(month))
-                    logger.info(f"  📊 Found experience claim: {month} months")
-                except ValueError:
-                    continue
+        for row in claims.rows('years') + claims.rows('months'):
+            experience_claims.append(claims.value_of(row))
+            if self.log_hits:
+                logger.info(f"  📊 Found experience claim: {claims.label_of(row)}")
         
         # Determine most likely experience level
         if experience_claims:
@@ -162,36 +260,38 @@ class TruthWeaver:
                 experience = f"{experience_months // 12}-{(experience_months // 12) + 1} years"
         else:
             # Look for qualitative indicators
-            if any(word in all_text for word in self.experience_patterns['beginner']):
+            if hits.in_text('beginner'):
                 experience = "beginner"
-            elif any(word in all_text for word in self.experience_patterns['advanced']):
+            elif hits.in_text('advanced'):
                 experience = "advanced"
             else:
                 experience = "unknown"
         
         # Extract programming language
         detected_language = "unknown"
-        for lang, keywords in self.programming_languages.items():
-            if any(keyword in all_text for keyword in keywords):
+        for lang in self.programming_languages:
+            if hits.in_text(f'language:{lang}'):
                 detected_language = lang
-                logger.info(f"  💻 Detected programming language: {lang}")
+                if self.log_hits:
+                    logger.info(f"  💻 Detected programming language: {lang}")
                 break
         
         logger.info(f"✅ Programming experience extracted: {experience}, Language: {detected_language}")
         return experience, detected_language
     
-    def extract_skill_mastery(self, sessions: List[str], experience: str) -> str:
+    def extract_skill_mastery(self, sessions: List[str], experience: str, hits: Optional[KeywordIndex] = None) -> str:
         """Determine skill mastery level based on sessions and experience"""
         logger.info("🎯 Determining skill mastery level")
         
-        all_text = ' '.join(sessions).lower()
+        if hits is None:
+            hits = self.scan_keywords(sessions)
         
         # Check for explicit mastery claims
-        if any(word in all_text for word in self.experience_patterns['advanced']):
+        if hits.in_text('advanced'):
             mastery = "advanced"
-        elif any(word in all_text for word in self.experience_patterns['beginner']):
+        elif hits.in_text('beginner'):
             mastery = "beginner"
-        elif any(word in all_text for word in self.experience_patterns['intermediate']):
+        elif hits.in_text('intermediate'):
             mastery = "intermediate"
         else:
             # Infer from experience
@@ -209,28 +309,21 @@ class TruthWeaver:
         logger.info(f"✅ Skill mastery determined: {mastery}")
         return mastery
     
-    def extract_leadership_and_team_info(self, sessions: List[str]) -> Tuple[str, str]:
+    def extract_leadership_and_team_info(self, sessions: List[str], claims: Optional[ClaimTable] = None) -> Tuple[str, str]:
         """Extract leadership claims and team experience"""
         logger.info("👥 Extracting leadership and team information")
         
-        all_text = ' '.join(sessions).lower()
+        if claims is None:
+            claims = self.extract_claims(sessions)
         
         # Check for leadership roles
-        has_leadership = any(role in all_text for role in self.leadership_patterns['leadership_roles'])
+        has_leadership = bool(claims.rows('leadership_roles'))
         
         # Check for team size mentions
-        team_size_matches = re.findall(self.leadership_patterns['team_size'], all_text)
-        team_sizes = []
-        for match in team_size_matches:
-            for group in match:
-                if group:
-                    try:
-                        team_sizes.append(int(group))
-                    except ValueError:
-                        continue
+        team_sizes = [claims.value_of(row) for row in claims.rows('team_size')]
         
         # Check for individual work indicators
-        works_alone = any(indicator in all_text for indicator in self.leadership_patterns['individual'])
+        works_alone = bool(claims.rows('individual'))
         
         # Determine leadership claims
         if has_leadership or team_sizes:
@@ -254,67 +347,82 @@ class TruthWeaver:
         logger.info(f"✅ Leadership and team info extracted")
         return leadership_claims, team_experience
     
-    def extract_skills_and_keywords(self, sessions: List[str]) -> List[str]:
+    def extract_skills_and_keywords(self, sessions: List[str], hits: Optional[KeywordIndex] = None) -> List[str]:
         """Extract technical skills and relevant keywords"""
         logger.info("🔧 Extracting technical skills and keywords")
         
-        all_text = ' '.join(sessions).lower()
-        
-        # Common technical keywords
-        tech_keywords = [
-            ' machine learning ', ' ml ', ' ai ', 'artificial intelligence',
-            'data science', 'analytics', 'big data',
-            'web development', 'frontend', 'backend', 'full stack',
-            'database', 'sql', 'nosql', 'mongodb', 'postgresql',
-            'cloud', ' aws ', 'azure', 'gcp', 'docker', 'kubernetes',
-            ' api ', ' rest ', 'graphql', 'microservices',
-            'testing', 'unit testing', 'integration testing',
-            'agile', 'scrum', 'devops', 'ci/cd'
-        ]
+        if hits is None:
+            hits = self.scan_keywords(sessions)
+        found_tech = hits.keywords('tech')
         
         found_skills = []
-        for keyword in tech_keywords:
-            if keyword in all_text:
+        for keyword in self.tech_keywords:
+            if keyword in found_tech:
                 found_skills.append(keyword.title())
-                logger.info(f"  🎯 Found skill: {keyword}")
+                if self.log_hits:
+                    logger.info(f"  🎯 Found skill: {keyword}")
         
         # Also check for programming language specific skills
         for lang, lang_keywords in self.programming_languages.items():
+            found_lang = hits.keywords(f'language:{lang}')
             for keyword in lang_keywords:
-                if keyword in all_text and keyword not in found_skills:
+                if keyword in found_lang and keyword not in found_skills:
                     found_skills.append(keyword.title())
         
         logger.info(f"✅ Extracted {len(found_skills)} technical skills")
         return found_skills
     
-    def detect_deception_patterns(self, sessions: List[str]) -> List[Dict[str, Any]]:
-        """Detect contradiction patterns across sessions"""
+    def session_propositions(self, sessions: List[str]) -> List[Tuple[int, str]]:
+        """Rule-based propositions (textToPropSentences) for every session, 1-based"""
+        return [(i + 1, proposition) for i, session in enumerate(sessions)
+                for proposition in map_to_propositions(clean_text(session))]
+    
+    def proposition_pairs(self, propositions: List[Tuple[int, str]]) -> List[CandidatePair]:
+        """Same-topic proposition pairs from different sessions, without comparing every pair"""
+        with metrics.timer('truth_weaver.proposition_index'):
+            index = PropositionIndex().add_all(propositions)
+            pairs = index.pairs(self.topic_threshold)
+        metrics.count('truth_weaver.propositions', len(index))
+        metrics.count('truth_weaver.proposition_pairs', len(pairs))
+        return pairs
+    
+    def score_claim_pair(self, pair: CandidatePair) -> Optional[str]:
+        """Why two same-topic propositions contradict each other, or None"""
+        # "3 years with Python" / "5 years with Java" share a topic but are different claims
+        if overlap(claim_tokens(pair.first), claim_tokens(pair.second)) < self.claim_threshold:
+            return None
+        # a figure given for the same unit that changed: "seven years" / "two years"
+        first, second = figures(pair.first), figures(pair.second)
+        for unit in first.keys() & second.keys():
+            if first[unit] != second[unit]:
+                return "different figures"
+        # the same claim made in one session and denied in another
+        if is_negated(pair.first) != is_negated(pair.second):
+            return "negated"
+        return None
+    
+    def detect_deception_patterns(self, sessions: List[str], claims: Optional[ClaimTable] = None,
+                                  propositions: Optional[List[Tuple[int, str]]] = None) -> List[Dict[str, Any]]:
+        """Detect contradiction patterns across sessions.
+        
+        With claim_contradictions on, propositions ((session, text) pairs) are also paired by topic;
+        rule-based ones are derived from the sessions when not given.
+        """
         logger.info("🕵️ Analyzing deception patterns and contradictions")
         
+        if claims is None:
+            claims = self.extract_claims(sessions)
+        
         deception_patterns = []
         
-        # Extract all experience claims across sessions
+        # Experience claims that sit inside one session, by session, years before months
+        duration_rows = [row for row in claims.rows(kind=DURATION) if claims.contained[row]]
+        duration_rows.sort(key=lambda row: (claims.session[row], claims.category_of(row) != 'years', row))
         experience_claims = []
-        for i, session in enumerate(sessions):
-            session_lower = session.lower()
-            
-            # Look for years
-            years_in_session = re.findall(self.experience_patterns['years'], session_lower)
-            for year in years_in_session:
-                try:
-                    experience_claims.append((i+1, f"{year} years"))
-                    logger.info(f"  📝 Session {i+1}: Found experience claim '{year} years'")
-                except ValueError:
-                    continue
-            
-            # Look for months
-            months_in_session = re.findall(self.experience_patterns['months'], session_lower)
-            for month in months_in_session:
-                try:
-                    experience_claims.append((i+1, f"{month} months"))
-                    logger.info(f"  📝 Session {i+1}: Found experience claim '{month} months'")
-                except ValueError:
-                    continue
+        for row in duration_rows:
+            experience_claims.append((claims.session[row]+1, claims.label_of(row)))
+            if self.log_hits:
+                logger.info(f"  📝 Session {claims.session[row]+1}: Found experience claim '{claims.label_of(row)}'")
         
         # Check for contradictions in experience claims
         if len(set([claim[1] for claim in experience_claims])) > 1:
@@ -327,17 +435,8 @@ class TruthWeaver:
             logger.info(f"  ⚠️  Found experience contradictions: {unique_claims}")
         
         # Check for leadership contradictions
-        leadership_sessions = []
-        individual_sessions = []
-        
-        for i, session in enumerate(sessions):
-            session_lower = session.lower()
-            
-            if any(role in session_lower for role in self.leadership_patterns['leadership_roles']):
-                leadership_sessions.append(i+1)
-            
-            if any(indicator in session_lower for indicator in self.leadership_patterns['individual']):
-                individual_sessions.append(i+1)
+        leadership_sessions = [i+1 for i in claims.sessions_with('leadership_roles')]
+        individual_sessions = [i+1 for i in claims.sessions_with('individual')]
         
         if leadership_sessions and individual_sessions:
             deception_patterns.append({
@@ -348,16 +447,13 @@ class TruthWeaver:
             logger.info(f"  ⚠️  Found leadership contradictions between sessions")
         
         # Check for confidence level changes (emotional patterns)
+        level_sessions = {level: set(claims.sessions_with(level)) for level in self.confidence_patterns}
         confidence_levels = []
-        for i, session in enumerate(sessions):
-            session_lower = session.lower()
-            
-            if any(word in session_lower for word in ['confident', 'sure', 'definitely', 'absolutely']):
-                confidence_levels.append((i+1, 'confident'))
-            elif any(word in session_lower for word in ['maybe', 'perhaps', 'not sure', 'uncertain']):
-                confidence_levels.append((i+1, 'uncertain'))
-            elif any(word in session_lower for word in ['sobbing', 'crying', 'breakdown', 'emotional']):
-                confidence_levels.append((i+1, 'emotional_breakdown'))
+        for i in range(len(sessions)):
+            for level in self.confidence_patterns:
+                if i in level_sessions[level]:
+                    confidence_levels.append((i+1, level))
+                    break
         
         if len(set([level[1] for level in confidence_levels])) > 2:
             deception_patterns.append({
@@ -367,6 +463,23 @@ class TruthWeaver:
             })
             logger.info(f"  ⚠️  Found emotional inconsistencies across sessions")
         
+        # General contradictions: same-topic propositions from different sessions that disagree
+        if self.claim_contradictions:
+            if propositions is None:
+                propositions = self.session_propositions(sessions)
+            for pair in self.proposition_pairs(propositions):
+                reason = self.score_claim_pair(pair)
+                if reason is None:
+                    continue
+                deception_patterns.append({
+                    "lie_type": "claim_contradiction",
+                    "contradictory_claims": [pair.first, pair.second],
+                    "sessions_involved": sorted(set(pair.first_sessions + pair.second_sessions)),
+                    "reason": reason
+                })
+                if self.log_hits:
+                    logger.info(f"  ⚠️  Found claim contradiction ({reason}): {pair.first!r} / {pair.second!r}")
+        
         logger.info(f"✅ Detected {len(deception_patterns)} deception patterns")
         return deception_patterns
     
@@ -374,21 +487,30 @@ class TruthWeaver:
         """Analyze a single shadow agent's testimonies"""
         logger.info(f"🔮 Analyzing Shadow Agent: {shadow_id}")
         logger.info(f"  📊 Processing {len(sessions)} sessions")
+        metrics.count('truth_weaver.shadows')
+        metrics.count('truth_weaver.sessions', len(sessions))
         
-        # Extract programming experience and language
-        experience, language = self.extract_programming_experience(sessions)
-        
-        # Determine skill mastery
-        skill_mastery = self.extract_skill_mastery(sessions, experience)
-        
-        # Extract leadership and team information
-        leadership_claims, team_experience = self.extract_leadership_and_team_info(sessions)
-        
-        # Extract technical skills
-        skills_keywords = self.extract_skills_and_keywords(sessions)
-        
-        # Detect deception patterns
-        deception_patterns = self.detect_deception_patterns(sessions)
+        with metrics.timer('truth_weaver.analyze_shadow'):
+            # Scan once for every keyword table and extract the typed claims; the extractors share both
+            hits = self.scan_keywords(sessions)
+            claims = self.extract_claims(sessions, hits)
+            
+            with metrics.timer('truth_weaver.extractors'):
+                # Extract programming experience and language
+                experience, language = self.extract_programming_experience(sessions, claims)
+                
+                # Determine skill mastery
+                skill_mastery = self.extract_skill_mastery(sessions, experience, hits)
+                
+                # Extract leadership and team information
+                leadership_claims, team_experience = self.extract_leadership_and_team_info(sessions, claims)
+                
+                # Extract technical skills
+                skills_keywords = self.extract_skills_and_keywords(sessions, hits)
+                
+                # Detect deception patterns
+                deception_patterns = self.detect_deception_patterns(sessions, claims)
+        metrics.count('truth_weaver.deception_patterns', len(deception_patterns))
         
         # Compile analysis results
         analysis = {
@@ -401,44 +523,93 @@ class TruthWeaver:
                 "team_experience": team_experience,
                 "skills_and_other_keywords": skills_keywords
             },
-            "deception_patterns": deception_patterns
+            "deception_patterns": deception_patterns,
+            "claims": claims.records()
         }
         
         logger.info(f"✅ Analysis complete for {shadow_id}")
         return analysis
     
-    def process_transcript(self, filename: str = 'input.txt') -> List[Dict[str, Any]]:
+    def stream_session_records(self, filename: str) -> Iterator[Tuple[str, List[str]]]:
+        """Stream (shadow_id, sessions) from JSONL session records, one shadow at a time"""
+        logger.info(f"📖 Streaming session records: {filename}")
+        for shadow_id, records in iter_shadows(filename):
+            logger.info(f"👤 Identified subject: {shadow_id} ({len(records)} sessions)")
+            yield shadow_id.lower(), [record['text'] for record in records]
+    
+    def iter_results(self, filename: str = 'input.txt', workers: int = 1,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        """Analyze shadows as they are read, yielding each result straight away, in input order.
+        
+        With workers > 1, shadows go to a process pool in chunks of chunk_size, with at most
+        two chunks per worker in flight, so memory stays bounded however long the input is.
+        """
+        if filename.endswith('.jsonl'):
+            # Structured records carry their own session boundaries
+            shadows = self.stream_session_records(filename)
+        else:
+            shadows = self.stream_sessions(filename)
+        
+        # Only process shadows that have sessions
+        shadows = ((shadow_id, sessions) for shadow_id, sessions in shadows if sessions)
+        
+        if workers <= 1:
+            for shadow_id, sessions in shadows:
+                yield self.analyze_shadow(shadow_id, sessions)
+            return
+        
+        logger.info(f"⚙️ Analyzing with {workers} worker processes, {chunk_size} shadows per task")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(not self.log_hits, self.claim_contradictions)) as pool:
+            in_flight = deque()
+            for chunk in _chunks(shadows, chunk_size):
+                in_flight.append(pool.submit(_analyze_chunk, chunk))
+                if len(in_flight) >= workers * 2:
+                    yield from self._collect(in_flight.popleft())
+            while in_flight:
+                yield from self._collect(in_flight.popleft())
+    
+    @staticmethod
+    def _collect(future) -> List[Dict[str, Any]]:
+        """A chunk's results; the worker's timers and counters are merged into this process"""
+        results, snapshot = future.result()
+        metrics.merge(snapshot)
+        return results
+    
+    def process_transcript(self, filename: str = 'input.txt', workers: int = 1,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict[str, Any]]:
         """Main processing function"""
         logger.info("🚀 Starting Truth Weaver analysis")
         
-        # Read input file
-        content = self.read_input_file(filename)
-        
-        # Parse sessions
-        sessions_data = self.parse_sessions(content)
-        
-        # Analyze each shadow
-        results = []
-        for shadow_id, sessions in sessions_data.items():
-            if sessions:  # Only process if there are sessions
-                analysis = self.analyze_shadow(shadow_id, sessions)
-                results.append(analysis)
+        # Analyze each shadow as soon as its sessions are parsed
+        results = list(self.iter_results(filename, workers, chunk_size))
         
         logger.info(f"🎉 Truth Weaver analysis complete! Processed {len(results)} shadow agents")
         return results
     
+    def write_results(self, filename: str, writer: ResultWriter, workers: int = 1,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Analyze and write each shadow as it completes; nothing accumulates in memory"""
+        logger.info("🚀 Starting Truth Weaver analysis")
+        
+        try:
+            for result in self.iter_results(filename, workers, chunk_size):
+                with metrics.timer('truth_weaver.write'):
+                    writer.write(result)
+        finally:
+            writer.close()
+        
+        logger.info(f"🎉 Truth Weaver analysis complete! Processed {writer.count} shadow agents")
+        return writer.count
+    
     def save_results(self, results: List[Dict[str, Any]], output_filename: str = 'output.txt'):
         """Save results to output file"""
         logger.info(f"💾 Saving results to {output_filename}")
         
         try:
-            with open(output_filename, 'w', encoding='utf-8') as file:
-                # Write JSON format results
-                for result in results:
-                    file.write(json.dumps(result, indent=2, ensure_ascii=False))
-                    file.write('\n' + '='*50 + '\n')
-                
-                logger.info(f"✅ Results saved successfully to {output_filename}")
+            with ResultWriter.to_files(output_filename, None, flush_every=len(results) or 1) as writer:
+                writer.write_all(results)
+            logger.info(f"✅ Results saved successfully to {output_filename}")
         except Exception as e:
             logger.error(f"❌ Error saving results: {e}")
             raise
@@ -448,37 +619,83 @@ class TruthWeaver:
         logger.info(f"📄 Creating JSON output: {json_filename}")
         
         try:
-            with open(json_filename, 'w', encoding='utf-8') as file:
-                json.dump(results, file, indent=2, ensure_ascii=False)
-                logger.info(f"✅ JSON output saved to {json_filename}")
+            with ResultWriter.to_files(None, json_filename, flush_every=len(results) or 1) as writer:
+                writer.write_all(results)
+            logger.info(f"✅ JSON output saved to {json_filename}")
         except Exception as e:
             logger.error(f"❌ Error creating JSON output: {e}")
             raise
 
+# Process pool workers build their own TruthWeaver once and reuse it for every chunk
+_worker_weaver = None
+
+def _init_worker(quiet: bool = False, claim_contradictions: bool = False):
+    global _worker_weaver
+    # a forked worker starts with a copy of the parent's numbers; only report its own
+    metrics.reset()
+    _worker_weaver = TruthWeaver(quiet, claim_contradictions)
+
+def _analyze_chunk(chunk: List[Tuple[str, List[str]]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    results = [_worker_weaver.analyze_shadow(shadow_id, sessions) for shadow_id, sessions in chunk]
+    return results, metrics.drain()
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Truth Weaver - Whispering Shadows Analyzer")
+    parser.add_argument('input', nargs='?', default='input.txt', help="transcript (.txt) or session records (.jsonl)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="analyze shadows in this many processes (0 = one per core; 1 = serial)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="shadows per worker task")
+    parser.add_argument('--quiet', action='store_true', help="skip the per-keyword and per-session log lines")
+    parser.add_argument('--contradictions', action='store_true',
+                        help="also report same-topic propositions that conflict across sessions (claim_contradiction)")
+    parser.add_argument('--jsonl', help="also write one result per line to this path (e.g. truth_analysis.jsonl)")
+    parser.add_argument('--flush-every', type=int, default=1, help="flush the output files every N shadows")
+    parser.add_argument('--index', help="also append every result to the claim index in this directory (see claim_index.py)")
+    parser.add_argument('--metrics', help="write stage timers and counters as JSON to this path")
+    parser.add_argument('--profile', help="run under cProfile and save the stats to this path")
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    
     print("🔮 Truth Weaver - Whispering Shadows Analyzer")
     print("=" * 50)
     
     try:
-        # Initialize Truth Weaver
-        weaver = TruthWeaver()
-        
-        # Process the transcript
-        results = weaver.process_transcript('input.txt')
-        
-        # Save results
-        weaver.save_results(results, 'output.txt')
-        weaver.create_json_output(results, 'truth_analysis.json')
+        with instrumented(args.metrics, args.profile):
+            # Initialize Truth Weaver
+            weaver = TruthWeaver(args.quiet, args.contradictions)
+            
+            # Process the transcript, writing every result to all outputs as soon as it is ready;
+            # check the input first so a bad path doesn't truncate the previous outputs
+            if not os.path.isfile(args.input):
+                raise FileNotFoundError(args.input)
+            sinks = [ClaimIndexWriter(args.index)] if args.index else []
+            writer = ResultWriter.to_files('output.txt', 'truth_analysis.json', args.jsonl or None, args.flush_every,
+                                           sinks)
+            count = weaver.write_results(args.input, writer, workers, max(1, args.chunk_size))
         
         print("\n🎉 Analysis Complete!")
-        print(f"📊 Analyzed {len(results)} shadow agents")
+        print(f"📊 Analyzed {count} shadow agents")
         print("📁 Files created:")
         print("  - output.txt (detailed results)")
         print("  - truth_analysis.json (JSON format)")
+        if args.jsonl:
+            print(f"  - {args.jsonl} (one result per line)")
+        if args.index:
+            print(f"  - {args.index}/ (claim index)")
         
     except FileNotFoundError:
-        print("❌ Error: input.txt file not found!")
+        print(f"❌ Error: {args.input} file not found!")
         print("Please ensure the input.txt file exists in the same directory.")
     except Exception as e:
         print(f"❌ An error occurred: {e}")
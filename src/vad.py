@@ -0,0 +1,77 @@
+'''
+Cheap energy-based voice activity detection for splitting long recordings.
+
+Works on the float32 16 kHz mono buffers produced by main.preprocess_audio.
+Frames are classified as speech or silence from their RMS level relative to the
+recording's own noise floor. Chunks are cut in the middle of silences so no
+word straddles a boundary.
+'''
+from typing import List, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def frame_levels(audio: np.ndarray, frame_samples: int) -> np.ndarray:
+    """RMS level in dBFS of each full frame"""
+    n_frames = len(audio) // frame_samples
+    if n_frames == 0:
+        return np.zeros(0)
+    frames = audio[:n_frames * frame_samples].reshape(n_frames, frame_samples).astype(np.float64)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_mask(levels: np.ndarray, margin_db: float = 12.0, floor_percentile: float = 10) -> np.ndarray:
+    """True for frames louder than the noise floor by margin_db"""
+    if len(levels) == 0:
+        return np.zeros(0, dtype=bool)
+    floor = np.percentile(levels, floor_percentile)
+    peak = np.percentile(levels, 99)
+    # on near-constant recordings floor+margin can sit above the speech itself
+    threshold = min(floor + margin_db, (floor + peak) / 2)
+    return levels > threshold
+
+
+def silence_midpoints(mask: np.ndarray, min_frames: int) -> np.ndarray:
+    """Frame index at the middle of every silent run at least min_frames long"""
+    padded = np.concatenate(([0], (~mask).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[::2], edges[1::2]
+    keep = (ends - starts) >= min_frames
+    return (starts[keep] + ends[keep]) // 2
+
+
+def split_on_silence(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, target_seconds: float = 30.0,
+                     min_silence: float = 0.3, frame_ms: int = 30) -> List[Tuple[int, int]]:
+    """Split audio into (start, end) sample ranges of roughly target_seconds.
+
+    Cuts land at the silence midpoint closest to the target length, between
+    0.5x and 1.5x of it, falling back to a hard cut when a stretch has no pause.
+    Ranges are contiguous; ranges that contain no speech at all are dropped.
+    """
+    frame_samples = int(sample_rate * frame_ms / 1000)
+    mask = speech_mask(frame_levels(audio, frame_samples))
+    cuts = silence_midpoints(mask, max(1, int(min_silence * 1000 / frame_ms))) * frame_samples
+    target = int(target_seconds * sample_rate)
+    min_chunk, max_chunk = target // 2, target + target // 2
+
+    bounds = []
+    start = 0
+    while len(audio) - start > max_chunk:
+        window = cuts[(cuts > start + min_chunk) & (cuts <= start + max_chunk)]
+        if len(window):
+            cut = int(window[np.argmin(np.abs(window - (start + target)))])
+        else:
+            cut = start + max_chunk
+        bounds.append((start, cut))
+        start = cut
+    if start < len(audio):
+        bounds.append((start, len(audio)))
+
+    def has_speech(start: int, end: int) -> bool:
+        return bool(mask[start // frame_samples:max(start // frame_samples + 1, end // frame_samples)].any())
+
+    # a recording too short to have any full frame is kept as-is
+    return [b for b in bounds if len(mask) == 0 or has_speech(*b)]
@@ -0,0 +1,55 @@
+'''
+Thin client for whisper_server.py, drop-in for `python main.py input.mp3`.
+
+    python whisper_client.py input.mp3 [more.mp3 ...]
+    python whisper_client.py --stats
+'''
+import os
+import sys
+import json
+import argparse
+import urllib.request
+import urllib.error
+
+# keep in sync with whisper_server.DEFAULT_HOST/DEFAULT_PORT; importing it would pull in whisper
+DEFAULT_SERVER="http://127.0.0.1:8765"
+
+def _request(url,payload=None):
+    data=json.dumps(payload).encode("utf-8") if payload is not None else None
+    req=urllib.request.Request(url,data=data,headers={"Content-Type":"application/json"})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read())
+
+def transcribe(input_file,server=DEFAULT_SERVER,write=True):
+    # the server resolves paths on its own filesystem, so always send an absolute path
+    return _request(f"{server}/transcribe",{"path":os.path.abspath(input_file),"write":write})
+
+def stats(server=DEFAULT_SERVER):
+    return _request(f"{server}/stats")
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Submit audio files to a running whisper_server.py")
+    parser.add_argument("files",nargs="*")
+    parser.add_argument("--server",default=DEFAULT_SERVER)
+    parser.add_argument("--stats",action="store_true",help="print server queue depth, latency and RTF")
+    args=parser.parse_args()
+    if not args.files and not args.stats:
+        parser.print_usage()
+        sys.exit(1)
+    try:
+        for input_file in args.files:
+            result=transcribe(input_file,args.server)
+            if "error" in result:
+                print(f"{input_file}: {result['error']}")
+                continue
+            print(result["text"].strip())
+            print(f"Transcription saved to {result['output_file']} "
+                  f"(latency {result['latency']}s, queue wait {result['queue_wait']}s, rtf {result['rtf']})")
+        if args.stats:
+            print(json.dumps(stats(args.server),indent=2))
+    except urllib.error.URLError as e:
+        print(f"could not reach whisper server at {args.server}: {e.reason}")
+        sys.exit(1)
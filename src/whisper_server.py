@@ -0,0 +1,203 @@
+'''
+Resident Whisper transcription server.
+
+Loads the Whisper model once and serves transcription jobs over a local HTTP API,
+so each clip only pays for decoding instead of a multi-second model load.
+
+- POST /transcribe  {"path": "/abs/path/clip.mp3", "write": true}
+    blocks until the job is done and returns the text plus timings
+- GET /stats
+    queue depth, jobs served, per-job latency and real-time factor (RTF)
+
+RTF = processing seconds / audio seconds, so anything below 1.0 is faster than real time.
+Use whisper_client.py to submit jobs.
+'''
+import json
+import time
+import queue
+import threading
+import argparse
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import main
+
+DEFAULT_HOST="127.0.0.1"
+DEFAULT_PORT=8765
+
+class TranscriptionJob:
+    def __init__(self,path,write=True):
+        self.path=path
+        self.write=write
+        self.submitted=time.perf_counter()
+        self.done=threading.Event()
+        self.result=None
+        self.error=None
+
+class TranscriptionWorker:
+    """Owns the resident model and drains the job queue on a single thread"""
+    def __init__(self,model_name=main.MODEL_NAME,history=100,cache=None):
+        self.model_name=model_name
+        self.model=main.load_model(model_name)
+        self.cache=cache
+        self.cache_hits=0
+        self.jobs=queue.Queue()
+        self.lock=threading.Lock()
+        self.recent=deque(maxlen=history)
+        self.jobs_done=0
+        self.jobs_failed=0
+        self.audio_seconds=0.0
+        self.busy_seconds=0.0
+        self.started=time.time()
+        self.thread=threading.Thread(target=self._run,daemon=True)
+        self.thread.start()
+
+    def submit(self,path,write=True):
+        job=TranscriptionJob(path,write)
+        self.jobs.put(job)
+        return job
+
+    def _run(self):
+        while True:
+            job=self.jobs.get()
+            started=time.perf_counter()
+            try:
+                key=transcription=None
+                if self.cache is not None:
+                    key,transcription=main.cached_transcription(self.cache,job.path,self.model_name)
+                if transcription is not None:
+                    self._finish_cached(job,transcription,started)
+                    continue
+                audio=main.load_audio(job.path)
+                duration=main.audio_duration(audio)
+                transcription=main.transcribe(self.model,audio)
+                if self.cache is not None:
+                    self.cache.put(key,transcription)
+                output_file=main.write_transcription(job.path,transcription) if job.write else None
+                finished=time.perf_counter()
+                elapsed=finished-started
+                job.result={
+                    "path":job.path,
+                    "text":transcription['text'],
+                    "output_file":output_file,
+                    "audio_seconds":round(duration,3),
+                    "queue_wait":round(started-job.submitted,3),
+                    "latency":round(finished-job.submitted,3),
+                    "processing":round(elapsed,3),
+                    "rtf":round(elapsed/duration,3) if duration else None,
+                    "cached":False,
+                }
+                with self.lock:
+                    self.jobs_done+=1
+                    self.audio_seconds+=duration
+                    self.busy_seconds+=elapsed
+                    self.recent.append({k:job.result[k] for k in ("path","audio_seconds","queue_wait","latency","rtf")})
+                print(f"transcribed {job.path} in {elapsed:.2f}s (rtf {job.result['rtf']}, queue depth {self.jobs.qsize()})")
+            except Exception as e:
+                job.error=f"{type(e).__name__}: {e}"
+                with self.lock:
+                    self.jobs_failed+=1
+                print(f"failed {job.path}: {job.error}")
+            finally:
+                job.done.set()
+                self.jobs.task_done()
+
+    def _finish_cached(self,job,transcription,started):
+        output_file=main.write_transcription(job.path,transcription) if job.write else None
+        finished=time.perf_counter()
+        job.result={
+            "path":job.path,
+            "text":transcription['text'],
+            "output_file":output_file,
+            "audio_seconds":None,
+            "queue_wait":round(started-job.submitted,3),
+            "latency":round(finished-job.submitted,3),
+            "processing":round(finished-started,3),
+            "rtf":None,
+            "cached":True,
+        }
+        with self.lock:
+            self.cache_hits+=1
+            self.recent.append({k:job.result[k] for k in ("path","audio_seconds","queue_wait","latency","rtf")})
+
+    def stats(self):
+        with self.lock:
+            recent=list(self.recent)
+            latencies=[r["latency"] for r in recent]
+            return {
+                "model":self.model_name,
+                "uptime":round(time.time()-self.started,1),
+                "queue_depth":self.jobs.qsize(),
+                "jobs_done":self.jobs_done,
+                "jobs_failed":self.jobs_failed,
+                "cache_hits":self.cache_hits,
+                "audio_seconds":round(self.audio_seconds,3),
+                "busy_seconds":round(self.busy_seconds,3),
+                "rtf":round(self.busy_seconds/self.audio_seconds,3) if self.audio_seconds else None,
+                "mean_latency":round(sum(latencies)/len(latencies),3) if latencies else None,
+                "max_latency":max(latencies) if latencies else None,
+                "recent":recent[-10:],
+            }
+
+def make_handler(worker):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self,status,payload):
+            body=json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type","application/json")
+            self.send_header("Content-Length",str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path=="/stats":
+                self._send(200,worker.stats())
+            else:
+                self._send(404,{"error":f"unknown endpoint {self.path}"})
+
+        def do_POST(self):
+            if self.path!="/transcribe":
+                self._send(404,{"error":f"unknown endpoint {self.path}"})
+                return
+            try:
+                length=int(self.headers.get("Content-Length",0))
+                request=json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(request,dict):
+                    raise ValueError("body must be a JSON object")
+                path=request["path"]
+            except (ValueError,KeyError) as e:
+                self._send(400,{"error":f"bad request: {e}"})
+                return
+            job=worker.submit(path,request.get("write",True))
+            job.done.wait()
+            if job.error:
+                self._send(500,{"error":job.error,"path":path})
+            else:
+                self._send(200,job.result)
+
+        def log_message(self,format,*args):
+            pass
+    return Handler
+
+def serve(host=DEFAULT_HOST,port=DEFAULT_PORT,model_name=main.MODEL_NAME,cache=None):
+    worker=TranscriptionWorker(model_name,cache=cache)
+    server=ThreadingHTTPServer((host,port),make_handler(worker))
+    print(f"whisper server ({model_name}) listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("shutting down")
+    finally:
+        server.server_close()
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description="Resident Whisper transcription server")
+    parser.add_argument("--host",default=DEFAULT_HOST)
+    parser.add_argument("--port",type=int,default=DEFAULT_PORT)
+    parser.add_argument("--model",default=main.MODEL_NAME)
+    parser.add_argument("--no-cache",action="store_true",help="always run Whisper, ignoring the transcription cache")
+    parser.add_argument("--cache-dir",default=main.TRANSCRIPTION_CACHE_DIR)
+    parser.add_argument("--cache-size-mb",type=int,default=512)
+    args=parser.parse_args()
+    cache=None if args.no_cache else main.open_transcription_cache(args.cache_dir,args.cache_size_mb)
+    serve(args.host,args.port,args.model,cache)
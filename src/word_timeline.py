@@ -0,0 +1,92 @@
+'''
+Columnar word timeline built from a Whisper result (word_timestamps=True).
+
+One NumPy array per attribute instead of one dict per word: start/end/pause
+times, an interned token id per word, and stammer / long-pause flags. All of
+them are computed with vectorized operations. A timeline round-trips through
+a compressed .npz, so the disfluency features can be reused without running
+Whisper again.
+'''
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+LONG_PAUSE_SECONDS = 0.5
+
+
+class WordTimeline:
+    def __init__(self, vocab: List[str], tokens: np.ndarray, start: np.ndarray, end: np.ndarray,
+                 long_pause_seconds: float = LONG_PAUSE_SECONDS):
+        self.vocab = vocab
+        self.tokens = np.asarray(tokens, dtype=np.int32)
+        self.start = np.asarray(start, dtype=np.float64)
+        self.end = np.asarray(end, dtype=np.float64)
+        self.long_pause_seconds = long_pause_seconds
+        self._compute_features()
+
+    @classmethod
+    def from_transcription(cls, transcription: Dict[str, Any], long_pause_seconds: float = LONG_PAUSE_SECONDS) -> "WordTimeline":
+        index: Dict[str, int] = {}
+        vocab: List[str] = []
+        tokens, starts, ends = [], [], []
+        for seg in transcription['segments']:
+            for w in seg.get('words', []):
+                word = w['word'].strip()
+                token = index.get(word)
+                if token is None:
+                    token = index[word] = len(vocab)
+                    vocab.append(word)
+                tokens.append(token)
+                starts.append(w['start'])
+                ends.append(w['end'])
+        return cls(vocab, np.array(tokens, dtype=np.int32), np.array(starts), np.array(ends), long_pause_seconds)
+
+    def _compute_features(self):
+        # stammer = same word as the previous one, ignoring case; compare on lowercase ids
+        lower_index: Dict[str, int] = {}
+        lower_of_vocab = np.array([lower_index.setdefault(w.lower(), len(lower_index)) for w in self.vocab], dtype=np.int32)
+        lower_tokens = lower_of_vocab[self.tokens] if len(self.tokens) else self.tokens
+        previous_end = np.concatenate(([0.0], self.end[:-1])) if len(self.end) else self.end
+        self.pause_before = np.round(self.start - previous_end, 3)
+        self.is_stammer = np.zeros(len(self.tokens), dtype=bool)
+        self.is_stammer[1:] = lower_tokens[1:] == lower_tokens[:-1]
+        self.long_pause = self.pause_before > self.long_pause_seconds
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def words(self) -> np.ndarray:
+        return np.asarray(self.vocab, dtype=object)[self.tokens] if self.vocab else np.zeros(0, dtype=object)
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Per-word dicts in the old analyze_transcription shape, produced lazily"""
+        for token, start, end, pause, stammer in zip(self.tokens.tolist(), self.start.tolist(), self.end.tolist(),
+                                                     self.pause_before.tolist(), self.is_stammer.tolist()):
+            yield {'word': self.vocab[token], 'start': start, 'end': end, 'pause_before': pause, 'is_stammer': stammer}
+
+    def features(self) -> Dict[str, Any]:
+        """Disfluency summary for downstream analysis"""
+        n = len(self)
+        duration = float(self.end[-1] - self.start[0]) if n else 0.0
+        return {
+            'words': n,
+            'duration': round(duration, 3),
+            'words_per_minute': round(n / duration * 60, 1) if duration > 0 else 0.0,
+            'stammers': int(self.is_stammer.sum()),
+            'long_pauses': int(self.long_pause.sum()),
+            'mean_pause': round(float(self.pause_before[1:].mean()), 3) if n > 1 else 0.0,
+            'max_pause': round(float(self.pause_before.max()), 3) if n else 0.0,
+        }
+
+    def save(self, path: str):
+        np.savez_compressed(path, vocab=np.array(self.vocab, dtype=str), tokens=self.tokens,
+                            start=self.start.astype(np.float32), end=self.end.astype(np.float32),
+                            long_pause_seconds=np.float64(self.long_pause_seconds))
+
+    @classmethod
+    def load(cls, path: str) -> "WordTimeline":
+        with np.load(path, allow_pickle=False) as data:
+            # float32 on disk is plenty for centisecond Whisper timestamps; round away the widening noise
+            return cls(data['vocab'].tolist(), data['tokens'], np.round(data['start'].astype(np.float64), 2),
+                       np.round(data['end'].astype(np.float64), 2), float(data['long_pause_seconds']))